@@ -69,7 +69,7 @@ usage() {
     echo ""
     echo -e "${YELLOW}Notes:${NC}"
     echo "  • --test will automatically create a Python virtual environment (.venv)"
-    echo "  • --test will install pytest and cffi if not present"
+    echo "  • --test will install pytest, cffi and setuptools if not present"
     echo "  • --clean will remove the .venv directory"
     echo ""
     exit 0
@@ -199,12 +199,26 @@ build() {
     # Return to project root
     cd "$SCRIPT_DIR"
     
+    generate_cdef
+    
     print_success "Build complete"
     print_info "Binaries located in: $BUILD_DIR/bin/$CONFIG/"
     echo ""
     ls -lh "$BUILD_DIR/bin/$CONFIG/" 2>/dev/null || true
 }
 
+generate_cdef() {
+    # Refresh the tests' CFFI declarations so they don't re-parse the header
+    if ! command -v python3 &> /dev/null; then
+        print_warning "python3 not found, skipping tests/matchengine.cdef"
+        return
+    fi
+    
+    # Only rewrites the file when the header's stamp has changed
+    print_info "Generating CFFI declarations..."
+    python3 tests/cffi_header.py include/matchengine.h tests/matchengine.cdef
+}
+
 setup_test_environment() {
     print_info "Setting up test environment..."
     
@@ -238,8 +252,8 @@ setup_test_environment() {
     pip install --quiet --upgrade pip
     
     # Install test dependencies
-    print_info "Installing test dependencies (pytest, cffi)..."
-    pip install --quiet pytest cffi
+    print_info "Installing test dependencies (pytest, cffi, setuptools)..."
+    pip install --quiet pytest cffi setuptools
     
     print_success "Test environment ready"
 }
@@ -271,6 +285,12 @@ run_tests() {
     
     print_info "Using library: $LIB_FILE"
     
+    # API-mode bindings are faster per call; the tests fall back to ABI
+    # mode if they cannot be built
+    print_info "Building CFFI API-mode bindings..."
+    python3 tests/build_cffi.py "$CONFIG" > /dev/null \
+        || print_warning "CFFI API-mode build failed, tests will use ABI mode"
+    
     cd tests/
     
     echo ""
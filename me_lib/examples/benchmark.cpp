@@ -171,6 +171,114 @@ public:
         std::cout << "  (checksum: " << checksum << ")\n";
     }
     
+    void bench_depth_queries(size_t levels, size_t count) {
+        std::cout << "\nBenchmark: " << count << " depth queries over " 
+                  << levels << " levels\n";
+        std::cout << std::string(50, '-') << "\n";
+        
+        mx_order_book_clear(book_);
+        
+        // Same fragmented book as test_fragmented_price_levels
+        for (size_t i = 0; i < levels; ++i) {
+            mx_order_book_add_limit(book_, i + 1, MX_SIDE_SELL, 10000 + i, 10);
+        }
+        
+        auto start = Clock::now();
+        
+        uint64_t checksum = 0;
+        for (size_t i = 0; i < count; ++i) {
+            checksum += mx_order_book_get_depth(book_, MX_SIDE_SELL, 100);
+        }
+        
+        auto end = Clock::now();
+        Duration elapsed = end - start;
+        
+        double queries_per_sec = count / elapsed.count();
+        double ns_per_query = (elapsed.count() * 1e9) / count;
+        
+        std::cout << "  Time:         " << std::fixed << std::setprecision(4) 
+                  << elapsed.count() << " seconds\n";
+        std::cout << "  Queries/sec:  " << std::fixed << std::setprecision(0) 
+                  << queries_per_sec << "\n";
+        std::cout << "  Latency:      " << std::fixed << std::setprecision(0) 
+                  << ns_per_query << " ns/query\n";
+        std::cout << "  (checksum: " << checksum << ")\n";
+    }
+    
+    void bench_sustained_flow(size_t iterations) {
+        std::cout << "\nBenchmark: Sustained flow, " << iterations << " iterations\n";
+        std::cout << std::string(50, '-') << "\n";
+        
+        mx_order_book_clear(book_);
+        trade_count_ = 0;
+        
+        // Same order flow as test_sustained_order_flow, driven natively
+        auto start = Clock::now();
+        
+        uint64_t order_id = 1;
+        size_t ops = 0;
+        for (size_t i = 0; i < iterations; ++i) {
+            uint32_t offset = static_cast<uint32_t>(i % 10) * 10;
+            
+            mx_order_book_add_limit(book_, order_id++, MX_SIDE_BUY, 9900 + offset, 100);
+            mx_order_book_add_limit(book_, order_id++, MX_SIDE_SELL, 10000 + offset, 100);
+            ops += 2;
+            
+            if (i > 100 && i % 10 == 0) {
+                mx_order_book_cancel(book_, order_id - 200);
+                ops++;
+            }
+        }
+        
+        auto end = Clock::now();
+        Duration elapsed = end - start;
+        
+        double ops_per_sec = ops / elapsed.count();
+        double ns_per_op = (elapsed.count() * 1e9) / ops;
+        
+        std::cout << "  Time:         " << std::fixed << std::setprecision(4) 
+                  << elapsed.count() << " seconds\n";
+        std::cout << "  Ops/sec:      " << std::fixed << std::setprecision(0) 
+                  << ops_per_sec << "\n";
+        std::cout << "  Latency:      " << std::fixed << std::setprecision(0) 
+                  << ns_per_op << " ns/op\n";
+        std::cout << "  Trades:       " << trade_count_ << "\n";
+    }
+    
+    void bench_hft_matching(size_t count) {
+        std::cout << "\nBenchmark: HFT matching, " << count << " orders\n";
+        std::cout << std::string(50, '-') << "\n";
+        
+        mx_order_book_clear(book_);
+        
+        // Same liquidity and flow as test_high_frequency_matching
+        for (size_t i = 0; i < 100; ++i) {
+            mx_order_book_add_limit(book_, i + 1, MX_SIDE_SELL, 10000 + i, 1000);
+        }
+        trade_count_ = 0;
+        
+        auto start = Clock::now();
+        
+        for (size_t i = 0; i < count; ++i) {
+            mx_order_book_add_limit(book_, 1000 + i, MX_SIDE_BUY, 
+                                   10000 + i % 50, 10);
+        }
+        
+        auto end = Clock::now();
+        Duration elapsed = end - start;
+        
+        double orders_per_sec = count / elapsed.count();
+        double ns_per_order = (elapsed.count() * 1e9) / count;
+        
+        std::cout << "  Time:         " << std::fixed << std::setprecision(4) 
+                  << elapsed.count() << " seconds\n";
+        std::cout << "  Orders/sec:   " << std::fixed << std::setprecision(0) 
+                  << orders_per_sec << "\n";
+        std::cout << "  Latency:      " << std::fixed << std::setprecision(0) 
+                  << ns_per_order << " ns/order\n";
+        std::cout << "  Trades:       " << trade_count_ << "\n";
+    }
+    
     void run_all_benchmarks() {
         std::cout << "\n";
         std::cout << "╔════════════════════════════════════════════════╗\n";
@@ -181,6 +289,9 @@ public:
         bench_cancel_orders(10000);
         bench_matching(5000);
         bench_queries(100000);
+        bench_depth_queries(5000, 100000);
+        bench_sustained_flow(5000);
+        bench_hft_matching(10000);
         
         std::cout << "\n✓ Benchmark complete!\n\n";
     }
@@ -78,6 +78,14 @@ public:
     
     const CallbackContext& callbacks() const { return callbacks_; }
     
+    /**
+     * Restore freshly-constructed state (no callbacks, system time)
+     */
+    void reset() {
+        callbacks_ = CallbackContext();
+        use_system_time(true);
+    }
+    
     /* ========================================================================
      * Configuration
      * ===================================================================== */
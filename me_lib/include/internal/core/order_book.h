@@ -85,6 +85,17 @@ public:
     mx_status_t add_limit_order(OrderId order_id, Side side, 
                                 Price price, Quantity quantity);
     
+    /**
+     * Add several simple limit orders resting at one price on one side.
+     * Looks the level up once and updates the best price once; falls back
+     * to add_limit_order per order if the price would cross the book.
+     * Returns the number of orders accepted
+     */
+    uint32_t add_limit_orders_at_level(Side side, Price price,
+                                       const OrderId* order_ids,
+                                       const Quantity* quantities,
+                                       uint32_t count, int* results);
+    
     /**
      * Add a market order
      */
@@ -172,6 +183,12 @@ public:
      */
     void clear();
     
+    /**
+     * Clear all orders and zero the trade counters, leaving the book
+     * as it was when created
+     */
+    void reset();
+    
     /**
      * Process expired orders (DAY/GTD)
      */
@@ -11,6 +11,7 @@
 #include "../utils/memory_pool.h"
 #include "../utils/hash_map.h"
 #include "order.h"
+#include <type_traits>
 
 namespace matchx {
 
@@ -208,6 +209,20 @@ public:
      * Clear all orders (for orderbook reset)
      */
     void clear() {
+        // Clearing the lookup table wipes every bucket, even when it holds
+        // no orders - skip it so resetting an empty book stays cheap
+        if (order_lookup_.empty()) return;
+        
+        // When most of the pool is live, rebuilding the freelist chunk by
+        // chunk beats walking the lookup table and freeing orders one by one
+        static_assert(std::is_trivially_destructible<Order>::value,
+                      "pool reset skips Order destructors");
+        if (pool_.allocated() * 2 >= pool_.capacity()) {
+            order_lookup_.clear();
+            pool_.reset();
+            return;
+        }
+        
         // Destroy all orders
         for (auto& pair : order_lookup_) {
             pool_.destroy(pair.second);
@@ -55,6 +55,7 @@ struct mx_order_book_s;
 
 typedef struct mx_context_s mx_context_t;
 typedef struct mx_order_book_s mx_order_book_t;
+typedef struct mx_trade_recorder_s mx_trade_recorder_t;
 
 /* ============================================================================
  * Enumerations
@@ -141,6 +142,43 @@ typedef void (*mx_order_callback_t)(
     uint32_t remaining_quantity
 );
 
+/* ============================================================================
+ * Batch Types
+ * ========================================================================= */
+
+/* Limit order entry for mx_order_book_add_limit_batch */
+typedef struct {
+    uint64_t order_id;
+    mx_side_t side;
+    uint32_t price;                  /* Price in ticks */
+    uint32_t quantity;
+} mx_limit_order_t;
+
+/* Trade captured by an mx_trade_recorder_t */
+typedef struct {
+    uint64_t aggressive_order_id;
+    uint64_t passive_order_id;
+    uint32_t price;
+    uint32_t quantity;
+    uint64_t timestamp;
+} mx_trade_record_t;
+
+/* Operation codes for mx_order_book_replay */
+typedef enum {
+    MX_OP_ADD_LIMIT = 0,
+    MX_OP_ADD_MARKET = 1,
+    MX_OP_CANCEL = 2
+} mx_op_code_t;
+
+/* Recorded operation for mx_order_book_replay */
+typedef struct {
+    uint64_t order_id;
+    mx_op_code_t op;
+    mx_side_t side;                  /* Ignored for MX_OP_CANCEL */
+    uint32_t price;                  /* Price in ticks, MX_OP_ADD_LIMIT only */
+    uint32_t quantity;               /* Ignored for MX_OP_CANCEL */
+} mx_op_t;
+
 /* ============================================================================
  * Memory Allocator Functions
  * ========================================================================= */
@@ -209,6 +247,15 @@ MX_API void mx_context_set_timestamp(mx_context_t* ctx, uint64_t timestamp);
  */
 MX_API uint64_t mx_context_get_timestamp(const mx_context_t* ctx);
 
+/**
+ * Reset a context to its freshly-created state.
+ * Clears both callbacks and user data, and re-enables system time.
+ * Order books created from the context are not affected.
+ * 
+ * @param ctx Context handle
+ */
+MX_API void mx_context_reset(mx_context_t* ctx);
+
 /* ============================================================================
  * Order Book Management
  * ========================================================================= */
@@ -263,6 +310,16 @@ MX_API void mx_order_book_get_stats(
  */
 MX_API void mx_order_book_clear(mx_order_book_t* book);
 
+/**
+ * Return the order book to its freshly created state.
+ * Clears all orders like mx_order_book_clear() and also zeroes the
+ * trade statistics, reusing the book's memory instead of freeing it.
+ * No callbacks are invoked.
+ * 
+ * @param book Order book
+ */
+MX_API void mx_order_book_reset(mx_order_book_t* book);
+
 /* ============================================================================
  * Order Operations - Simple API
  * ========================================================================= */
@@ -303,6 +360,68 @@ MX_API int mx_order_book_add_market(
     uint32_t quantity
 );
 
+/**
+ * Add a batch of simple limit orders in a single call.
+ * Each entry is processed in array order exactly as mx_order_book_add_limit
+ * would process it; a rejected entry does not stop the rest of the batch.
+ * 
+ * @param book    Order book
+ * @param orders  Array of orders to add
+ * @param count   Number of entries in orders
+ * @param results Output: status code for each entry (can be NULL)
+ * @return Number of entries that returned MX_STATUS_OK
+ */
+MX_API uint32_t mx_order_book_add_limit_batch(
+    mx_order_book_t* book,
+    const mx_limit_order_t* orders,
+    uint32_t count,
+    int* results
+);
+
+/**
+ * Add several simple limit orders at the same side and price in one call.
+ * Equivalent to calling mx_order_book_add_limit for each entry in order,
+ * but when the price does not cross the book the level is looked up and
+ * the best price updated only once for the whole batch.
+ * 
+ * @param book       Order book
+ * @param side       Buy or sell (shared by all orders)
+ * @param price      Price in ticks (shared by all orders)
+ * @param order_ids  Array of unique order IDs
+ * @param quantities Array of quantities, one per order ID
+ * @param count      Number of orders
+ * @param results    Output: status code for each order (can be NULL)
+ * @return Number of orders that returned MX_STATUS_OK
+ */
+MX_API uint32_t mx_order_book_add_limit_same_level(
+    mx_order_book_t* book,
+    mx_side_t side,
+    uint32_t price,
+    const uint64_t* order_ids,
+    const uint32_t* quantities,
+    uint32_t count,
+    int* results
+);
+
+/**
+ * Replay a recorded sequence of adds and cancels in a single call.
+ * Each entry is dispatched in array order to mx_order_book_add_limit,
+ * mx_order_book_add_market or mx_order_book_cancel; a failed entry does
+ * not stop the rest of the sequence.
+ * 
+ * @param book    Order book
+ * @param ops     Array of operations
+ * @param count   Number of entries in ops
+ * @param results Output: status code for each entry (can be NULL)
+ * @return Number of entries that returned MX_STATUS_OK
+ */
+MX_API uint32_t mx_order_book_replay(
+    mx_order_book_t* book,
+    const mx_op_t* ops,
+    uint32_t count,
+    int* results
+);
+
 /* ============================================================================
  * Order Operations - Advanced API
  * ========================================================================= */
@@ -349,6 +468,23 @@ MX_API int mx_order_book_cancel(
     uint64_t order_id
 );
 
+/**
+ * Cancel several orders in one call.
+ * Equivalent to calling mx_order_book_cancel for each ID in order.
+ * 
+ * @param book      Order book
+ * @param order_ids Array of order IDs to cancel
+ * @param count     Number of order IDs
+ * @param results   Output: status code for each order (can be NULL)
+ * @return Number of orders that returned MX_STATUS_OK
+ */
+MX_API uint32_t mx_order_book_cancel_many(
+    mx_order_book_t* book,
+    const uint64_t* order_ids,
+    uint32_t count,
+    int* results
+);
+
 /**
  * Modify an order's quantity (only reduces quantity, maintains time priority).
  * 
@@ -481,6 +617,23 @@ MX_API int mx_order_book_get_order_info(
     uint32_t* filled
 );
 
+/**
+ * Get the remaining quantity of several orders in a single call.
+ * Orders that are not in the book report a quantity of 0.
+ * 
+ * @param book       Order book
+ * @param order_ids  Array of order IDs to query
+ * @param count      Number of entries in order_ids
+ * @param quantities Output: remaining quantity for each order (count entries)
+ * @return Number of orders found in the book
+ */
+MX_API uint32_t mx_order_book_get_quantities(
+    const mx_order_book_t* book,
+    const uint64_t* order_ids,
+    uint32_t count,
+    uint32_t* quantities
+);
+
 /* ============================================================================
  * Administrative Functions
  * ========================================================================= */
@@ -507,6 +660,65 @@ MX_API uint32_t mx_order_book_process_expirations(
  */
 MX_API uint32_t mx_order_book_process_stops(mx_order_book_t* book);
 
+/* ============================================================================
+ * Trade Recorder
+ * Collects trades in native memory, without calling back into the host
+ * ========================================================================= */
+
+/**
+ * Create a trade recorder.
+ * Install it with mx_context_set_callbacks(ctx, mx_trade_recorder_on_trade,
+ * order_cb, recorder); the recorder is then the context's user_data.
+ * 
+ * @param capacity Number of trades to reserve space for (grows as needed)
+ * @return Recorder handle, or NULL on failure
+ */
+MX_API mx_trade_recorder_t* mx_trade_recorder_new(uint32_t capacity);
+
+/**
+ * Free a trade recorder.
+ * 
+ * @param recorder Recorder handle (can be NULL)
+ */
+MX_API void mx_trade_recorder_free(mx_trade_recorder_t* recorder);
+
+/**
+ * Discard all recorded trades, keeping the reserved space.
+ * 
+ * @param recorder Recorder handle
+ */
+MX_API void mx_trade_recorder_clear(mx_trade_recorder_t* recorder);
+
+/**
+ * Get the number of recorded trades.
+ * 
+ * @param recorder Recorder handle
+ * @return Number of trades
+ */
+MX_API uint32_t mx_trade_recorder_count(const mx_trade_recorder_t* recorder);
+
+/**
+ * Get the recorded trades in the order they happened.
+ * The pointer is invalidated by the next recorded trade or clear.
+ * 
+ * @param recorder Recorder handle
+ * @return Array of mx_trade_recorder_count() entries
+ */
+MX_API const mx_trade_record_t* mx_trade_recorder_data(const mx_trade_recorder_t* recorder);
+
+/**
+ * Trade callback that appends to the recorder passed as user_data.
+ * Matches mx_trade_callback_t.
+ */
+MX_API void mx_trade_recorder_on_trade(
+    void* user_data,
+    uint64_t aggressive_order_id,
+    uint64_t passive_order_id,
+    uint32_t price,
+    uint32_t quantity,
+    uint64_t timestamp
+);
+
 /* ============================================================================
  * Utility Functions
  * ========================================================================= */
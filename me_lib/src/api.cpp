@@ -69,6 +69,13 @@ void mx_order_book_clear(mx_order_book_t* book) {
     orderbook->clear();
 }
 
+void mx_order_book_reset(mx_order_book_t* book) {
+    if (!book) return;
+    
+    matchx::OrderBook* orderbook = AS_TYPE(matchx::OrderBook, book);
+    orderbook->reset();
+}
+
 /* ============================================================================
  * Simple Order Operations
  * ========================================================================= */
@@ -84,6 +91,72 @@ int mx_order_book_add_limit(mx_order_book_t* book,
     return orderbook->add_limit_order(order_id, side, price, quantity);
 }
 
+uint32_t mx_order_book_add_limit_batch(mx_order_book_t* book,
+                                       const mx_limit_order_t* orders,
+                                       uint32_t count,
+                                       int* results) {
+    if (!book || !orders) return 0;
+    
+    matchx::OrderBook* orderbook = AS_TYPE(matchx::OrderBook, book);
+    uint32_t accepted = 0;
+    
+    for (uint32_t i = 0; i < count; ++i) {
+        const mx_limit_order_t& o = orders[i];
+        int status = orderbook->add_limit_order(o.order_id, o.side, o.price, o.quantity);
+        if (results) results[i] = status;
+        if (status == MX_STATUS_OK) ++accepted;
+    }
+    
+    return accepted;
+}
+
+uint32_t mx_order_book_add_limit_same_level(mx_order_book_t* book,
+                                            mx_side_t side,
+                                            uint32_t price,
+                                            const uint64_t* order_ids,
+                                            const uint32_t* quantities,
+                                            uint32_t count,
+                                            int* results) {
+    if (!book || !order_ids || !quantities) return 0;
+    
+    matchx::OrderBook* orderbook = AS_TYPE(matchx::OrderBook, book);
+    return orderbook->add_limit_orders_at_level(side, price, order_ids, quantities,
+                                                count, results);
+}
+
+uint32_t mx_order_book_replay(mx_order_book_t* book,
+                              const mx_op_t* ops,
+                              uint32_t count,
+                              int* results) {
+    if (!book || !ops) return 0;
+    
+    matchx::OrderBook* orderbook = AS_TYPE(matchx::OrderBook, book);
+    uint32_t succeeded = 0;
+    
+    for (uint32_t i = 0; i < count; ++i) {
+        const mx_op_t& op = ops[i];
+        int status;
+        switch (op.op) {
+            case MX_OP_ADD_LIMIT:
+                status = orderbook->add_limit_order(op.order_id, op.side, op.price, op.quantity);
+                break;
+            case MX_OP_ADD_MARKET:
+                status = orderbook->add_market_order(op.order_id, op.side, op.quantity);
+                break;
+            case MX_OP_CANCEL:
+                status = orderbook->cancel_order(op.order_id);
+                break;
+            default:
+                status = MX_STATUS_INVALID_PARAM;
+                break;
+        }
+        if (results) results[i] = status;
+        if (status == MX_STATUS_OK) ++succeeded;
+    }
+    
+    return succeeded;
+}
+
 int mx_order_book_add_market(mx_order_book_t* book,
                              uint64_t order_id,
                              mx_side_t side,
@@ -101,6 +174,24 @@ int mx_order_book_cancel(mx_order_book_t* book, uint64_t order_id) {
     return orderbook->cancel_order(order_id);
 }
 
+uint32_t mx_order_book_cancel_many(mx_order_book_t* book,
+                                   const uint64_t* order_ids,
+                                   uint32_t count,
+                                   int* results) {
+    if (!book || !order_ids) return 0;
+    
+    matchx::OrderBook* orderbook = AS_TYPE(matchx::OrderBook, book);
+    uint32_t cancelled = 0;
+    
+    for (uint32_t i = 0; i < count; ++i) {
+        int status = orderbook->cancel_order(order_ids[i]);
+        if (results) results[i] = status;
+        if (status == MX_STATUS_OK) ++cancelled;
+    }
+    
+    return cancelled;
+}
+
 int mx_order_book_modify(mx_order_book_t* book,
                          uint64_t order_id,
                          uint32_t new_quantity) {
@@ -227,6 +318,28 @@ int mx_order_book_get_order_info(const mx_order_book_t* book,
     return MX_STATUS_OK;
 }
 
+uint32_t mx_order_book_get_quantities(const mx_order_book_t* book,
+                                      const uint64_t* order_ids,
+                                      uint32_t count,
+                                      uint32_t* quantities) {
+    if (!book || !order_ids || !quantities) return 0;
+    
+    const matchx::OrderBook* orderbook = AS_CTYPE(matchx::OrderBook, book);
+    matchx::OrderSnapshot snapshot;
+    uint32_t found = 0;
+    
+    for (uint32_t i = 0; i < count; ++i) {
+        if (orderbook->get_order_info(order_ids[i], snapshot)) {
+            quantities[i] = snapshot.remaining_quantity;
+            ++found;
+        } else {
+            quantities[i] = 0;
+        }
+    }
+    
+    return found;
+}
+
 /* ============================================================================
  * Administrative Functions
  * ========================================================================= */
@@ -55,4 +55,11 @@ uint64_t mx_context_get_timestamp(const mx_context_t* ctx) {
     return context->get_timestamp();
 }
 
+void mx_context_reset(mx_context_t* ctx) {
+    if (!ctx) return;
+    
+    matchx::Context* context = reinterpret_cast<matchx::Context*>(ctx);
+    context->reset();
+}
+
 } // extern "C"
@@ -72,6 +72,74 @@ mx_status_t OrderBook::add_limit_order(OrderId order_id, Side side,
     return process_new_order(order);
 }
 
+uint32_t OrderBook::add_limit_orders_at_level(Side side, Price price,
+                                              const OrderId* order_ids,
+                                              const Quantity* quantities,
+                                              uint32_t count, int* results) {
+    uint32_t accepted = 0;
+    
+    // Crossing orders need the full matching path, one at a time
+    bool crosses = (side == MX_SIDE_BUY)
+        ? (best_ask_ > 0 && price >= best_ask_)
+        : (best_bid_ > 0 && price <= best_bid_);
+    
+    if (price == 0 || crosses) {
+        for (uint32_t i = 0; i < count; ++i) {
+            mx_status_t status = add_limit_order(order_ids[i], side, price, quantities[i]);
+            if (results) results[i] = status;
+            if (status == MX_STATUS_OK) ++accepted;
+        }
+        return accepted;
+    }
+    
+    // Resting orders on one side never cross each other, so each one can
+    // be queued directly at the level
+    Timestamp now = get_current_timestamp();
+    PriceLevel* level = nullptr;
+    
+    for (uint32_t i = 0; i < count; ++i) {
+        OrderId order_id = order_ids[i];
+        mx_status_t status = MX_STATUS_OK;
+        
+        if (order_id == INVALID_ORDER_ID) {
+            status = MX_STATUS_INVALID_PARAM;
+        } else if (quantities[i] == 0) {
+            status = MX_STATUS_INVALID_QUANTITY;
+        } else if (order_pool_.has_order(order_id)) {
+            status = MX_STATUS_DUPLICATE_ORDER;
+        } else {
+            Order* order = order_pool_.create_order(order_id, side, price, quantities[i], now);
+            if (!order) {
+                status = MX_STATUS_OUT_OF_MEMORY;
+            } else {
+                if (!level) {
+                    level = get_or_create_level(side, price);
+                    
+                    // Update best price once for the whole batch, before
+                    // the first callback so listeners see the new level
+                    if (side == MX_SIDE_BUY) {
+                        if (price > best_bid_) {
+                            best_bid_ = price;
+                        }
+                    } else {
+                        if (best_ask_ == 0 || price < best_ask_) {
+                            best_ask_ = price;
+                        }
+                    }
+                }
+                level->add_order(order);
+                notify_order_event(order_id, MX_EVENT_ORDER_ACCEPTED,
+                                   0, order->remaining_quantity());
+                ++accepted;
+            }
+        }
+        
+        if (results) results[i] = status;
+    }
+    
+    return accepted;
+}
+
 mx_status_t OrderBook::add_market_order(OrderId order_id, Side side, Quantity quantity) {
     if (order_id == INVALID_ORDER_ID) return MX_STATUS_INVALID_PARAM;
     if (quantity == 0) return MX_STATUS_INVALID_QUANTITY;
@@ -862,6 +930,13 @@ void OrderBook::clear() {
     best_ask_ = 0;
 }
 
+void OrderBook::reset() {
+    clear();
+    
+    total_trades_ = 0;
+    total_volume_ = 0;
+}
+
 uint32_t OrderBook::process_expirations(Timestamp current_time) {
     std::vector<OrderId> expired_orders;
     
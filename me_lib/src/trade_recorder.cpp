@@ -0,0 +1,70 @@
+/**
+ * Trade recorder implementation
+ * Appends trades to native storage from the trade callback
+ */
+
+#include "matchengine.h"
+#include "internal/allocator.h"
+#include "internal/utils/memory_pool.h"
+
+namespace matchx {
+
+struct TradeRecorder {
+    Vector<mx_trade_record_t> trades;
+    
+    MX_IMPLEMENTS_ALLOCATORS
+};
+
+} // namespace matchx
+
+/* ============================================================================
+ * C API Implementation
+ * ========================================================================= */
+
+extern "C" {
+
+mx_trade_recorder_t* mx_trade_recorder_new(uint32_t capacity) {
+    matchx::TradeRecorder* recorder = new matchx::TradeRecorder();
+    recorder->trades.reserve(capacity);
+    return reinterpret_cast<mx_trade_recorder_t*>(recorder);
+}
+
+void mx_trade_recorder_free(mx_trade_recorder_t* recorder) {
+    if (!recorder) return;
+    
+    delete reinterpret_cast<matchx::TradeRecorder*>(recorder);
+}
+
+void mx_trade_recorder_clear(mx_trade_recorder_t* recorder) {
+    if (!recorder) return;
+    
+    reinterpret_cast<matchx::TradeRecorder*>(recorder)->trades.clear();
+}
+
+uint32_t mx_trade_recorder_count(const mx_trade_recorder_t* recorder) {
+    if (!recorder) return 0;
+    
+    const matchx::TradeRecorder* rec = reinterpret_cast<const matchx::TradeRecorder*>(recorder);
+    return static_cast<uint32_t>(rec->trades.size());
+}
+
+const mx_trade_record_t* mx_trade_recorder_data(const mx_trade_recorder_t* recorder) {
+    if (!recorder) return nullptr;
+    
+    const matchx::TradeRecorder* rec = reinterpret_cast<const matchx::TradeRecorder*>(recorder);
+    return rec->trades.data();
+}
+
+void mx_trade_recorder_on_trade(void* user_data,
+                                uint64_t aggressive_order_id,
+                                uint64_t passive_order_id,
+                                uint32_t price,
+                                uint32_t quantity,
+                                uint64_t timestamp) {
+    if (!user_data) return;
+    
+    matchx::TradeRecorder* rec = static_cast<matchx::TradeRecorder*>(user_data);
+    rec->trades.push_back({aggressive_order_id, passive_order_id, price, quantity, timestamp});
+}
+
+} // extern "C"
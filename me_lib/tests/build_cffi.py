@@ -0,0 +1,141 @@
+"""
+Build the API-mode CFFI extension used by the tests
+Compiles _matchengine_cffi, C glue that calls the library directly
+instead of going through libffi on every call, into build/cffi/.
+testhelpers imports it while it is current (see is_current) and falls
+back to ABI mode (ffi.dlopen) otherwise:
+
+    python3 tests/build_cffi.py [release|debug]
+
+Without a config it links against the library get_library_path() finds,
+the same one the tests load in ABI mode.
+"""
+import functools
+import logging
+import os
+import sys
+from importlib.machinery import EXTENSION_SUFFIXES
+from cffi import FFI
+from cffi_header import parse_header_for_cffi, read_cdef
+
+MODULE_NAME = '_matchengine_cffi'
+
+here = os.path.abspath(os.path.dirname(__file__))
+project_root = os.path.dirname(here)
+include_dir = os.path.join(project_root, 'include')
+header_path = os.path.join(include_dir, 'matchengine.h')
+cdef_path = os.path.join(here, 'matchengine.cdef')
+output_dir = os.path.join(project_root, 'build', 'cffi')
+
+# Records the library the module was linked against
+stamp_path = os.path.join(output_dir, MODULE_NAME + '.lib')
+
+log = logging.getLogger("matchx.test")
+
+if sys.platform == 'darwin':
+    LIB_NAME = 'libMatchEngine.dylib'
+elif sys.platform == 'win32':
+    LIB_NAME = 'MatchEngine.dll'
+else:
+    LIB_NAME = 'libMatchEngine.so'
+
+@functools.lru_cache(maxsize=1)
+def get_library_path():
+    """Get the path to the compiled library"""
+    # Output directories in order of preference; each is listed once
+    # instead of stat()ing the library path in every candidate
+    roots = [
+        os.path.join(project_root, base, config)
+        for base in (os.path.join('build', 'bin'), 'bin')
+        for config in ('release', 'debug', 'Release', 'Debug')
+    ]
+    
+    for root in roots:
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    if entry.name == LIB_NAME:
+                        return entry.path
+        except OSError:
+            continue
+    
+    raise RuntimeError(
+        f"Could not find library {LIB_NAME} in any of:\n" +
+        "\n".join(f"  - {os.path.join(root, LIB_NAME)}" for root in roots) +
+        "\n\nPlease build the library first: ./build.sh --build"
+    )
+
+def build(config=None):
+    """
+    Compile the extension against build/bin/<config>, or against the
+    library get_library_path() finds; returns the module's path
+    """
+    if config is None:
+        lib_path = get_library_path()
+    else:
+        lib_path = os.path.join(project_root, 'build', 'bin', config, LIB_NAME)
+    lib_dir = os.path.dirname(lib_path)
+    
+    cdef = read_cdef(header_path, cdef_path)
+    
+    builder = FFI()
+    builder.cdef(cdef if cdef is not None else parse_header_for_cffi(header_path))
+    builder.set_source(
+        MODULE_NAME,
+        '#include "matchengine.h"',
+        include_dirs=[include_dir],
+        library_dirs=[lib_dir],
+        libraries=['MatchEngine'],
+        runtime_library_dirs=[] if sys.platform == 'win32' else [lib_dir],
+        # Resolve the library's symbols when the module loads rather than
+        # on the first call through each PLT entry
+        extra_link_args=['-Wl,-z,now'] if sys.platform.startswith('linux') else [],
+    )
+    module_path = builder.compile(tmpdir=output_dir)
+    
+    with open(stamp_path, 'w') as f:
+        f.write(lib_path)
+    return module_path
+
+def is_current(lib_path):
+    """
+    True if the module was linked against lib_path and built since the
+    header and the checked-in cdef last changed
+    """
+    try:
+        with open(stamp_path, 'r') as f:
+            if f.read() != lib_path:
+                return False
+    except OSError:
+        return False
+    
+    sources_mtime = max(os.stat(path).st_mtime_ns for path in (header_path, cdef_path))
+    for suffix in EXTENSION_SUFFIXES:
+        try:
+            if os.stat(os.path.join(output_dir, MODULE_NAME + suffix)).st_mtime_ns >= sources_mtime:
+                return True
+        except OSError:
+            pass
+    return False
+
+def try_build():
+    """
+    Build the module for the library the tests will load if it is
+    missing or stale; returns False if there is no library or the build
+    failed (no compiler, no Python headers)
+    """
+    try:
+        lib_path = get_library_path()
+    except RuntimeError:
+        return False
+    if is_current(lib_path):
+        return True
+    try:
+        build()
+    except Exception as e:
+        log.warning("CFFI API-mode build failed, using ABI mode: %s", e)
+        return False
+    return True
+
+if __name__ == '__main__':
+    print(build(*sys.argv[1:2]))
@@ -0,0 +1,305 @@
+"""
+CFFI declarations for matchengine.h
+Turns the public header into source ffi.cdef() accepts. Kept free of the
+library so the declarations can be generated ahead of the tests into
+tests/matchengine.cdef, which is checked in and refreshed by the build:
+
+    python3 tests/cffi_header.py include/matchengine.h tests/matchengine.cdef
+
+The file is only rewritten when its stamp no longer matches the header.
+--check exits non-zero if the file differs from what would be generated.
+"""
+import hashlib
+import re
+import subprocess
+import sys
+
+# First line of a generated .cdef, naming the header it was parsed from
+CDEF_STAMP = "/* generated from matchengine.h sha1:{} - do not edit */"
+
+# Patterns used by _parse_with_regex
+# Tokens of the single scan over the header's bytes: text to drop (C++
+# blocks, comments, preprocessor lines), nesting and declaration ends.
+# The lookahead lets the scan skip plain text without trying each branch
+_RE_TOKEN = re.compile(rb"""
+    (?=[/\#{}();])
+    (?: (?P<skip> \#ifdef\ __cplusplus.*?\#endif | /\*.*?\*/ | //[^\n]* | \#[^\n]* )
+      | (?P<open> [{(] )
+      | (?P<close> [})] )
+      | (?P<end> ; ) )
+""", re.DOTALL | re.VERBOSE)
+_RE_TYPEDEF_ENUM_NAME = re.compile(r'typedef\s+enum.*?}\s*(\w+);')
+_RE_TYPEDEF_STRUCT_NAME = re.compile(r'typedef\s+struct.*?}\s*(\w+);')
+_RE_TYPEDEF_OPAQUE = re.compile(r'typedef\s+struct\s+\w+\s+(\w+);')
+# Word followed by * but not preceded by )
+_RE_POINTER_TYPE = re.compile(r'(?<![)])\b(\w+)\s*\*')
+
+# Comments inside a declaration's source text (libclang extents)
+_RE_COMMENT = re.compile(rb'/\*.*?\*/|//[^\n]*', re.DOTALL)
+
+# Primitive C types that should NOT be treated as opaque types
+_PRIMITIVE_TYPES = frozenset({
+    'void', 'char', 'short', 'int', 'long', 'float', 'double',
+    'signed', 'unsigned', 'const', 'struct', 'enum', 'union',
+    'size_t', 'ssize_t', 'ptrdiff_t', 'wchar_t',
+    'uint8_t', 'uint16_t', 'uint32_t', 'uint64_t',
+    'int8_t', 'int16_t', 'int32_t', 'int64_t'
+})
+
+def parse_header_for_cffi(header_path):
+    """
+    Parse the header file and prepare it for CFFI.
+    Uses libclang (pip install libclang) when it is available and falls
+    back to the regex parser otherwise.
+    """
+    try:
+        parts = _parse_with_libclang(header_path)
+    except Exception:
+        # Missing bindings, missing shared library or a failed parse all
+        # mean the same thing here: use the regex parser instead
+        parts = _parse_with_regex(header_path)
+    return _assemble_cdef(*parts)
+
+def _compiler_include_dir():
+    """
+    Directory holding the C compiler's own headers (stddef.h), which the
+    libclang wheel does not ship
+    """
+    try:
+        out = subprocess.run(['cc', '-print-file-name=include'],
+                             capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+def _clean_declaration(text):
+    """Declaration source bytes without MX_API, whitespace collapsed"""
+    return ' '.join(text.replace(b'MX_API', b'').decode('ascii').split())
+
+def _parse_with_libclang(header_path):
+    """
+    Collect the header's declarations from libclang's AST
+    Returns (opaque_types, enums, structs, typedefs, functions) like
+    _parse_with_regex; raises if libclang is unavailable or the parse fails
+    """
+    from clang import cindex
+    kinds = cindex.CursorKind
+    
+    args = ['-x', 'c', '-std=c99']
+    include_dir = _compiler_include_dir()
+    if include_dir:
+        args += ['-isystem', include_dir]
+    
+    tu = cindex.Index.create().parse(header_path, args=args)
+    errors = [str(d) for d in tu.diagnostics if d.severity >= cindex.Diagnostic.Error]
+    if errors:
+        raise RuntimeError('; '.join(errors))
+    
+    with open(header_path, 'rb') as f:
+        content = f.read()
+    
+    def source(cursor):
+        """The declaration's own text, cleaned up like the regex parser's"""
+        text = content[cursor.extent.start.offset:cursor.extent.end.offset] + b';'
+        return _clean_declaration(_RE_COMMENT.sub(b'', text))
+    
+    opaque_types = set()
+    enums = []
+    structs = []
+    typedefs = []
+    functions = []
+    
+    for cursor in tu.cursor.get_children():
+        # Skip everything pulled in from stdint.h / stddef.h
+        if cursor.location.file is None or cursor.location.file.name != tu.spelling:
+            continue
+        
+        # libclang only finds and classifies the declarations; their text
+        # is taken from the header so both parsers emit the same cdef
+        if cursor.kind == kinds.FUNCTION_DECL:
+            functions.append(source(cursor))
+        elif cursor.kind == kinds.TYPEDEF_DECL:
+            target = cursor.underlying_typedef_type.get_canonical().get_declaration()
+            if target.kind == kinds.ENUM_DECL:
+                enums.append(source(cursor))
+            elif target.kind == kinds.STRUCT_DECL and target.get_definition() is None:
+                opaque_types.add(cursor.spelling)
+            elif target.kind == kinds.STRUCT_DECL:
+                structs.append(source(cursor))
+            else:
+                typedefs.append(source(cursor))
+    
+    return opaque_types, enums, structs, typedefs, functions
+
+def _parse_with_regex(header_path):
+    """
+    Collect the header's declarations with regular expressions
+    Handles multi-line declarations properly.
+    Returns (opaque_types, enums, structs, typedefs, functions)
+    """
+    with open(header_path, 'rb') as f:
+        content = f.read()
+    
+    # One pass over the bytes: a declaration is everything up to a
+    # semicolon outside braces and parentheses, minus the skipped text.
+    # DON'T replace stdint types - CFFI understands them natively!
+    declarations = []
+    pieces = []
+    pos = 0
+    depth = 0
+    
+    for token in _RE_TOKEN.finditer(content):
+        kind = token.lastgroup
+        if kind == 'skip':
+            pieces.append(content[pos:token.start()])
+            pos = token.end()
+        elif kind == 'open':
+            depth += 1
+        elif kind == 'close':
+            depth -= 1
+        elif depth == 0:
+            pieces.append(content[pos:token.end()])
+            pos = token.end()
+            declarations.append(_clean_declaration(b''.join(pieces)))
+            pieces = []
+    
+    # Now organize declarations
+    opaque_types = set()
+    defined_types = set()
+    enums = []
+    structs = []
+    typedefs = []
+    functions = []
+    
+    for decl in declarations:
+        # Categorize on the leading keywords: every declaration is either
+        # a typedef, keyed by what follows "typedef", or a prototype
+        head = decl.split(None, 2)
+        if not head:
+            continue
+        kind = head[1].rstrip('{') if head[0] == 'typedef' and len(head) > 1 else None
+        
+        if kind == 'enum':
+            enums.append(decl)
+            # Extract the typedef name
+            match = _RE_TYPEDEF_ENUM_NAME.search(decl)
+            if match:
+                defined_types.add(match.group(1))
+        elif kind == 'struct' and decl.find('{') == -1:
+            # Opaque struct typedef like: typedef struct xyz xyz_t;
+            match = _RE_TYPEDEF_OPAQUE.match(decl)
+            if match:
+                type_name = match.group(1)
+                if type_name not in _PRIMITIVE_TYPES:
+                    opaque_types.add(type_name)
+        elif kind == 'struct':
+            structs.append(decl)
+            match = _RE_TYPEDEF_STRUCT_NAME.search(decl)
+            if match:
+                defined_types.add(match.group(1))
+        elif kind is not None:
+            typedefs.append(decl)
+        elif decl.find('(') != -1:
+            functions.append(decl)
+            # Find pointer types in function signatures
+            matches = _RE_POINTER_TYPE.findall(decl)
+            for match in matches:
+                if match not in _PRIMITIVE_TYPES:
+                    opaque_types.add(match)
+    
+    # Only keep truly opaque types (not defined in this header); pointer
+    # types seen in prototypes include the structs defined above
+    opaque_types = opaque_types - defined_types
+    
+    return opaque_types, enums, structs, typedefs, functions
+
+def _assemble_cdef(opaque_types, enums, structs, typedefs, functions):
+    """Lay the collected declarations out in dependency order"""
+    # Build final CFFI-compatible header
+    result = []
+    
+    # stdint types and size_t are built into CFFI; redeclaring them here
+    # (e.g. uint64_t as unsigned long long) would not match LP64 platforms
+    # Declare opaque types first
+    for otype in sorted(opaque_types):
+        result.append(f"typedef struct {otype} {otype};")
+    
+    if opaque_types:
+        result.append("")
+    
+    # Add enums
+    for enum in enums:
+        result.append(enum)
+    if enums:
+        result.append("")
+    
+    # Add structs
+    for struct in structs:
+        result.append(struct)
+    if structs:
+        result.append("")
+    
+    # Add typedefs
+    for typedef in typedefs:
+        result.append(typedef)
+    if typedefs:
+        result.append("")
+    
+    # Add functions
+    for func in functions:
+        result.append(func)
+    
+    return '\n'.join(result)
+
+def header_digest(header_path):
+    """SHA-1 of the header's bytes, identifying the source of a .cdef"""
+    with open(header_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def _stamped_cdef(header_path):
+    """The stamped .cdef contents for header_path"""
+    return CDEF_STAMP.format(header_digest(header_path)) + '\n' + parse_header_for_cffi(header_path)
+
+def write_cdef(header_path, out_path):
+    """
+    Parse header_path and write the stamped CFFI declarations to out_path,
+    unless out_path is already stamped with this header; returns True if
+    the file was written
+    """
+    if read_cdef(header_path, out_path) is not None:
+        return False
+    with open(out_path, 'w') as f:
+        f.write(_stamped_cdef(header_path))
+    return True
+
+def check_cdef(header_path, cdef_path):
+    """True if cdef_path is exactly what write_cdef would generate"""
+    return read_cdef(header_path, cdef_path) == _stamped_cdef(header_path)
+
+def read_cdef(header_path, cdef_path):
+    """
+    Contents of a generated .cdef, or None if it is missing or was
+    generated from a different version of the header
+    """
+    try:
+        with open(cdef_path, 'r') as f:
+            content = f.read()
+    except OSError:
+        return None
+    
+    stamp = CDEF_STAMP.format(header_digest(header_path))
+    return content if content.startswith(stamp + '\n') else None
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    check = args[:1] == ['--check']
+    if check:
+        args = args[1:]
+    if len(args) != 2:
+        sys.exit(f"usage: {sys.argv[0]} [--check] <header> <output.cdef>")
+    if check:
+        if not check_cdef(*args):
+            sys.exit(f"{args[1]} is out of date with {args[0]}; "
+                     f"regenerate it with ./build.sh --build")
+    else:
+        write_cdef(*args)
@@ -3,18 +3,36 @@ pytest configuration and fixtures
 Provides common setup for all tests
 """
 
+import os
 import pytest
+from array import array
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+import build_cffi
+
+# Build (or refresh) the API-mode bindings before testhelpers chooses
+# between them and ABI mode. Under pytest-xdist the controller imports
+# this first, so workers find the module already built
+if not os.environ.get('PYTEST_XDIST_WORKER') and not os.environ.get('MATCHX_CFFI_ABI'):
+    build_cffi.try_build()
+
 from testhelpers import (
     ffi, lib,
     create_context, free_context,
-    create_order_book, free_order_book
+    create_order_book, free_order_book,
+    limit_batch, add_limit_batch,
+    Trade, OrderEvent, TRADE_CALLBACK_T, ORDER_CALLBACK_T,
+    SYM_TEST, SYM_BTC,
+    SIDE_BUY, SIDE_SELL, price_to_ticks
 )
 
-@pytest.fixture(scope='function')
+Version = namedtuple('Version', ['major', 'minor', 'patch'])
+
+@pytest.fixture(scope='session')
 def context():
     """
-    Create a fresh context for each test
-    Automatically cleaned up after test completes
+    Create a single context shared by the whole session
+    Reset between tests by _reset_context, freed at session end
     """
     ctx = create_context()
     assert ctx != ffi.NULL, "Failed to create context"
@@ -24,26 +42,31 @@ def context():
     # Cleanup
     free_context(ctx)
 
-@pytest.fixture(scope='function')
-def order_book(context):
+@pytest.fixture(scope='function', autouse=True)
+def _reset_context(context):
+    """
+    Drop callbacks and manual timestamps left behind by the previous test
+    """
+    lib.mx_context_reset(context)
+
+@pytest.fixture(scope='session')
+def _session_order_book(context):
     """
-    Create a fresh order book for each test
-    Automatically cleaned up after test completes
+    Order book behind order_book, created once per session
     """
-    book = create_order_book(context, "TEST")
+    book = create_order_book(context, SYM_TEST)
     assert book != ffi.NULL, "Failed to create order book"
     
     yield book
     
-    # Cleanup
     free_order_book(book)
 
-@pytest.fixture(scope='function')
-def btc_book(context):
+@pytest.fixture(scope='session')
+def _session_btc_book(context):
     """
-    Create an order book for BTC/USD
+    Order book behind btc_book, created once per session
     """
-    book = create_order_book(context, "BTCUSD")
+    book = create_order_book(context, SYM_BTC)
     assert book != ffi.NULL, "Failed to create BTC order book"
     
     yield book
@@ -51,100 +74,470 @@ def btc_book(context):
     free_order_book(book)
 
 @pytest.fixture(scope='function')
-def trade_recorder():
+def order_book(_session_order_book):
+    """
+    Empty order book for each test
+    The session book is reset in place instead of being recreated
+    """
+    lib.mx_order_book_reset(_session_order_book)
+    return _session_order_book
+
+@pytest.fixture(scope='function')
+def btc_book(_session_btc_book):
+    """
+    Empty order book for BTC/USD
+    """
+    lib.mx_order_book_reset(_session_btc_book)
+    return _session_btc_book
+
+# Tests with these markers only look at how many callbacks fired
+COUNT_ONLY_MARKERS = ('performance', 'stress')
+
+class CountingRecorder:
+    """
+    Drop-in for the recorders that only counts callbacks
+    Used for performance/stress tests, which never inspect the contents
+    """
+    __slots__ = ('_count',)
+    
+    def __init__(self):
+        self._count = 0
+    
+    def record(self, *args):
+        self._count += 1
+    
+    def clear(self):
+        self._count = 0
+    
+    def count(self):
+        return self._count
+    
+    def __len__(self):
+        return self._count
+
+class RecorderWindow:
+    """
+    Rows a recorder captured inside a scope() block
+    Reads the recorder's columns in place; nothing is copied
+    """
+    __slots__ = ('_recorder', '_start', '_stop')
+    
+    def __init__(self, recorder, start):
+        self._recorder = recorder
+        self._start = start
+        self._stop = None
+    
+    def _end(self):
+        return self._recorder._n if self._stop is None else self._stop
+    
+    def count(self):
+        return self._end() - self._start
+    
+    def __len__(self):
+        return self.count()
+    
+    def get_last(self):
+        end = self._end()
+        return self._recorder._row(end - 1) if end > self._start else None
+    
+    def get_all(self):
+        return tuple(self._recorder._row(i) for i in range(self._start, self._end()))
+
+@contextmanager
+def _scope(recorder):
+    window = RecorderWindow(recorder, recorder._n)
+    yield window
+    window._stop = recorder._n
+
+def _count_only(request):
+    """True if the requesting test is marked with a COUNT_ONLY_MARKERS marker"""
+    return any(request.node.get_closest_marker(m) for m in COUNT_ONLY_MARKERS)
+
+# Initial rows preallocated per recorder column
+RECORDER_CAPACITY = 4096
+
+def _column(typecode):
+    """Zero-filled typed column of RECORDER_CAPACITY rows"""
+    return array(typecode, bytes(RECORDER_CAPACITY * array(typecode).itemsize))
+
+def _grow(recorder, fields):
+    """Double the capacity of every column of a recorder"""
+    for field in fields:
+        column = getattr(recorder, field)
+        column.frombytes(bytes(len(column) * column.itemsize))
+
+@pytest.fixture(scope='function')
+def trade_recorder(request):
     """
     Fixture that records trades for verification
-    Returns a TradeRecorder object
+    Returns a TradeRecorder object (a CountingRecorder for
+    performance/stress tests)
+    
+    Trades are stored column-wise in preallocated typed arrays (no Python
+    object or reallocation per trade); Trade rows are only built when a
+    test asks for them
     """
+    if _count_only(request):
+        return CountingRecorder()
+    
     class TradeRecorder:
+        FIELDS = Trade._fields
+        __slots__ = FIELDS + ('_n', '_total_volume')
+        
         def __init__(self):
-            self.trades = []
+            self.aggressive_id = _column('Q')
+            self.passive_id = _column('Q')
+            self.price = _column('I')
+            self.quantity = _column('I')
+            self.timestamp = _column('Q')
+            self._n = 0
+            self._total_volume = 0
         
         def record(self, aggressive_id, passive_id, price, quantity, timestamp):
-            self.trades.append({
-                'aggressive_id': aggressive_id,
-                'passive_id': passive_id,
-                'price': price,
-                'quantity': quantity,
-                'timestamp': timestamp
-            })
+            n = self._n
+            if n == len(self.quantity):
+                _grow(self, self.FIELDS)
+            self.aggressive_id[n] = aggressive_id
+            self.passive_id[n] = passive_id
+            self.price[n] = price
+            self.quantity[n] = quantity
+            self.timestamp[n] = timestamp
+            self._n = n + 1
+            self._total_volume += quantity
+        
+        def _row(self, i):
+            return Trade(self.aggressive_id[i], self.passive_id[i], self.price[i],
+                         self.quantity[i], self.timestamp[i])
         
         def clear(self):
-            self.trades.clear()
+            self._n = 0
+            self._total_volume = 0
         
         def count(self):
-            return len(self.trades)
+            return self._n
+        
+        def __len__(self):
+            return self._n
+        
+        def _iter_rows(self):
+            for i in range(self._n):
+                yield self._row(i)
         
         def get_last(self):
-            return self.trades[-1] if self.trades else None
+            return self._row(self._n - 1) if self._n else None
         
         def get_all(self):
-            return self.trades.copy()
+            return tuple(self._iter_rows())
+        
+        def scope(self):
+            """Context manager yielding a window over rows recorded inside it"""
+            return _scope(self)
+        
+        def view(self):
+            """Trade of column slices holding every trade recorded so far"""
+            n = self._n
+            return Trade(*(getattr(self, f)[:n] for f in self.FIELDS))
         
         def total_volume(self):
-            return sum(t['quantity'] for t in self.trades)
+            return self._total_volume
     
     return TradeRecorder()
 
 @pytest.fixture(scope='function')
-def order_event_recorder():
+def order_event_recorder(request):
     """
     Fixture that records order events for verification
-    Returns an OrderEventRecorder object
+    Returns an OrderEventRecorder object (a CountingRecorder for
+    performance/stress tests)
+    
+    Events are stored column-wise like TradeRecorder
     """
+    if _count_only(request):
+        return CountingRecorder()
+    
     class OrderEventRecorder:
+        FIELDS = OrderEvent._fields
+        __slots__ = FIELDS + ('_n', '_by_id', '_by_id_kind', '_event_mask')
+        
         def __init__(self):
-            self.events = []
+            self.order_id = _column('Q')
+            self.event = _column('i')
+            self.filled_qty = _column('I')
+            self.remaining_qty = _column('I')
+            self._n = 0
+            self._by_id = defaultdict(list)
+            self._by_id_kind = defaultdict(list)
+            self._event_mask = {}
         
         def record(self, order_id, event, filled_qty, remaining_qty):
-            self.events.append({
-                'order_id': order_id,
-                'event': event,
-                'filled_qty': filled_qty,
-                'remaining_qty': remaining_qty
-            })
+            n = self._n
+            if n == len(self.order_id):
+                _grow(self, self.FIELDS)
+            self.order_id[n] = order_id
+            self.event[n] = event
+            self.filled_qty[n] = filled_qty
+            self.remaining_qty[n] = remaining_qty
+            self._n = n + 1
+            self._by_id[order_id].append(n)
+            self._by_id_kind[(order_id, event)].append(n)
+            self._event_mask[order_id] = self._event_mask.get(order_id, 0) | (1 << event)
+        
+        def _row(self, i):
+            return OrderEvent(self.order_id[i], self.event[i], self.filled_qty[i],
+                              self.remaining_qty[i])
         
         def clear(self):
-            self.events.clear()
+            self._n = 0
+            self._by_id.clear()
+            self._by_id_kind.clear()
+            self._event_mask.clear()
         
         def count(self):
-            return len(self.events)
+            return self._n
+        
+        def __len__(self):
+            return self._n
+        
+        def _iter_rows(self):
+            for i in range(self._n):
+                yield self._row(i)
         
         def get_last(self):
-            return self.events[-1] if self.events else None
+            return self._row(self._n - 1) if self._n else None
         
         def get_all(self):
-            return self.events.copy()
+            return tuple(self._iter_rows())
+        
+        def scope(self):
+            """Context manager yielding a window over rows recorded inside it"""
+            return _scope(self)
+        
+        def view(self):
+            """OrderEvent of column slices holding every event recorded so far"""
+            n = self._n
+            return OrderEvent(*(getattr(self, f)[:n] for f in self.FIELDS))
         
-        def get_for_order(self, order_id):
-            return [e for e in self.events if e['order_id'] == order_id]
+        def get_for_order(self, order_id, event=None):
+            """Events for order_id, optionally only those of one event kind"""
+            if event is None:
+                rows = self._by_id.get(order_id, ())
+            else:
+                rows = self._by_id_kind.get((order_id, event), ())
+            return [self._row(i) for i in rows]
+        
+        def has_event(self, order_id, event):
+            """True if event was ever reported for order_id"""
+            return bool(self._event_mask.get(order_id, 0) & (1 << event))
     
     return OrderEventRecorder()
 
+OutPtrs = namedtuple('OutPtrs', ['total', 'bids', 'asks', 'side', 'price', 'qty', 'filled'])
+
+@pytest.fixture(scope='session')
+def _out_ptr_pool():
+    """
+    Allocate the out-parameter buffers once per session
+    """
+    return OutPtrs(
+        total=ffi.new("uint32_t*"),
+        bids=ffi.new("uint32_t*"),
+        asks=ffi.new("uint32_t*"),
+        side=ffi.new("mx_side_t*"),
+        price=ffi.new("uint32_t*"),
+        qty=ffi.new("uint32_t*"),
+        filled=ffi.new("uint32_t*")
+    )
+
 @pytest.fixture(scope='function')
-def book_with_callbacks(context, trade_recorder, order_event_recorder):
+def out_ptrs(_out_ptr_pool):
     """
-    Create an order book with callbacks already set up
-    Returns (book, trade_recorder, order_event_recorder)
+    Reusable out-parameters for stats/order info queries
+    Zeroed before each test
+    """
+    for ptr in _out_ptr_pool:
+        ptr[0] = 0
+    return _out_ptr_pool
+
+@pytest.fixture(scope='function')
+def pinned_cpu():
+    """
+    Pin the test process to one CPU for the duration of a timing test
+    Picks the highest allowed CPU (CPU 0 usually takes the most interrupts)
+    Yields the CPU number, or None where affinity is unsupported
     """
-    from testhelpers import create_trade_callback, create_order_callback
+    if not hasattr(os, 'sched_setaffinity'):
+        yield None
+        return
     
-    # Create callbacks
-    trade_cb = create_trade_callback(trade_recorder.record)
-    order_cb = create_order_callback(order_event_recorder.record)
+    original = os.sched_getaffinity(0)
+    cpu = max(original)
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except OSError:
+        yield None
+        return
     
-    # Set callbacks on context
-    lib.mx_context_set_callbacks(context, trade_cb, order_cb, ffi.NULL)
+    try:
+        yield cpu
+    finally:
+        os.sched_setaffinity(0, original)
+
+# Keeps the current test's user_data handle alive while it is installed
+_recorder_handle = None
+
+@pytest.fixture(scope='session')
+def _callback_thunks():
+    """
+    Create the CFFI callback thunks once per session
+    user_data is a handle to the current recorders' bound record methods,
+    (record_trade, record_order_event), so no attribute is looked up per event
+    """
+    @ffi.callback(TRADE_CALLBACK_T)
+    def on_trade(user_data, aggressive_id, passive_id, price, quantity, timestamp):
+        ffi.from_handle(user_data)[0](aggressive_id, passive_id, price, quantity, timestamp)
     
-    # Create order book
-    book = create_order_book(context, "TEST")
+    @ffi.callback(ORDER_CALLBACK_T)
+    def on_order(user_data, order_id, event, filled_qty, remaining_qty):
+        ffi.from_handle(user_data)[1](order_id, event, filled_qty, remaining_qty)
+    
+    return (on_trade, on_order)
+
+def _install_recorders(context, thunks, trade_recorder, order_event_recorder):
+    """Install the session thunks with this test's recorders as user_data"""
+    global _recorder_handle
+    _recorder_handle = ffi.new_handle((trade_recorder.record, order_event_recorder.record))
+    
+    trade_cb, order_cb = thunks
+    lib.mx_context_set_callbacks(context, trade_cb, order_cb, _recorder_handle)
+
+@pytest.fixture(scope='session')
+def _session_callback_book(context):
+    """
+    Order book behind book_with_callbacks, created once per session
+    """
+    book = create_order_book(context, SYM_TEST)
     assert book != ffi.NULL, "Failed to create order book"
     
-    yield (book, trade_recorder, order_event_recorder)
+    yield book
     
-    # Cleanup
     free_order_book(book)
 
+@pytest.fixture(scope='function')
+def book_with_callbacks(context, _session_callback_book, _callback_thunks,
+                        trade_recorder, order_event_recorder):
+    """
+    Create an order book with callbacks already set up
+    Returns (book, trade_recorder, order_event_recorder)
+    
+    The session book is reset (reset raises no callbacks) before the
+    recorders are installed
+    """
+    book = _session_callback_book
+    lib.mx_order_book_reset(book)
+    
+    _install_recorders(context, _callback_thunks, trade_recorder, order_event_recorder)
+    
+    return (book, trade_recorder, order_event_recorder)
+
+@pytest.fixture(scope='session')
+def _native_recorder():
+    """
+    Library-side trade recorder, created once per session
+    """
+    recorder = lib.mx_trade_recorder_new(RECORDER_CAPACITY)
+    assert recorder != ffi.NULL, "Failed to create trade recorder"
+    
+    yield recorder
+    
+    lib.mx_trade_recorder_free(recorder)
+
+def _record_layout(ctype, fields):
+    """
+    (typecode, first index, stride) of each field of a struct array,
+    counted in units of the field's own size: a memoryview of the array
+    cast to typecode and sliced [first::stride] reads that field
+    """
+    size = ffi.sizeof(ctype)
+    members = dict(ffi.typeof(ctype).fields)
+    layout = []
+    for name in fields:
+        member = members[name]
+        width = ffi.sizeof(member.type)
+        assert member.offset % width == 0 and size % width == 0
+        layout.append(({8: 'Q', 4: 'I'}[width], member.offset // width, size // width))
+    return tuple(layout)
+
+# mx_trade_record_t fields in Trade column order
+_TRADE_RECORD_SIZE = ffi.sizeof("mx_trade_record_t")
+_TRADE_RECORD_LAYOUT = _record_layout("mx_trade_record_t", (
+    'aggressive_order_id', 'passive_order_id', 'price', 'quantity', 'timestamp'
+))
+
+@pytest.fixture(scope='function')
+def native_trade_book(context, _session_callback_book, _native_recorder):
+    """
+    Order book whose trades are recorded by the library itself
+    Returns (book, native_trades)
+    
+    No Python code runs per trade and order events are not reported;
+    native_trades exposes the same count/clear/column/view interface as
+    trade_recorder, reading the recorder only when asked
+    """
+    recorder = _native_recorder
+    
+    class NativeTrades:
+        __slots__ = ()
+        
+        def count(self):
+            return lib.mx_trade_recorder_count(recorder)
+        
+        def __len__(self):
+            return self.count()
+        
+        def clear(self):
+            lib.mx_trade_recorder_clear(recorder)
+        
+        def view(self):
+            """
+            Trade of strided memoryviews over the recorder's own buffer
+            Nothing is copied; the view is only valid until the next trade
+            is recorded or the recorder is cleared
+            """
+            n = self.count()
+            raw = memoryview(ffi.buffer(lib.mx_trade_recorder_data(recorder),
+                                        n * _TRADE_RECORD_SIZE))
+            words = {'Q': raw.cast('Q'), 'I': raw.cast('I')}
+            return Trade(*(words[typecode][start::stride]
+                           for typecode, start, stride in _TRADE_RECORD_LAYOUT))
+        
+        def __getattr__(self, name):
+            if name not in Trade._fields:
+                raise AttributeError(name)
+            return getattr(self.view(), name)
+    
+    book = _session_callback_book
+    lib.mx_order_book_reset(book)
+    lib.mx_trade_recorder_clear(recorder)
+    lib.mx_context_set_callbacks(context, lib.mx_trade_recorder_on_trade, ffi.NULL, recorder)
+    
+    return (book, NativeTrades())
+
+# Resting orders of populated_book: (order_id, side, price, quantity)
+POPULATED_ORDERS = (
+    (1001, SIDE_BUY, price_to_ticks(99.50), 100),
+    (1002, SIDE_BUY, price_to_ticks(99.00), 150),
+    (1003, SIDE_BUY, price_to_ticks(98.50), 200),
+    (2001, SIDE_SELL, price_to_ticks(100.50), 200),
+    (2002, SIDE_SELL, price_to_ticks(101.00), 300),
+    (2003, SIDE_SELL, price_to_ticks(101.50), 100),
+)
+
+_POPULATED_BATCH = limit_batch(POPULATED_ORDERS)
+
+def _load_populated_orders(book):
+    """Add the POPULATED_ORDERS to an empty book"""
+    add_limit_batch(book, _POPULATED_BATCH)
+
 @pytest.fixture(scope='function')
 def populated_book(book_with_callbacks):
     """
@@ -156,72 +549,58 @@ def populated_book(book_with_callbacks):
     100 @ $99.50           200 @ $100.50
     150 @ $99.00           300 @ $101.00
     200 @ $98.50           100 @ $101.50
-    """
-    from testhelpers import SIDE_BUY, SIDE_SELL, price_to_ticks
     
+    Built on the per-test book of book_with_callbacks, which is reset
+    before every test
+    """
     book, trades, events = book_with_callbacks
     
-    # Clear any initialization events
-    trades.clear()
-    events.clear()
-    
-    # Add bid orders (buy side)
-    lib.mx_order_book_add_limit(book, 1001, SIDE_BUY, price_to_ticks(99.50), 100)
-    lib.mx_order_book_add_limit(book, 1002, SIDE_BUY, price_to_ticks(99.00), 150)
-    lib.mx_order_book_add_limit(book, 1003, SIDE_BUY, price_to_ticks(98.50), 200)
-    
-    # Add ask orders (sell side)
-    lib.mx_order_book_add_limit(book, 2001, SIDE_SELL, price_to_ticks(100.50), 200)
-    lib.mx_order_book_add_limit(book, 2002, SIDE_SELL, price_to_ticks(101.00), 300)
-    lib.mx_order_book_add_limit(book, 2003, SIDE_SELL, price_to_ticks(101.50), 100)
+    _load_populated_orders(book)
     
     # Clear events from setup
     trades.clear()
     events.clear()
     
-    yield (book, trades, events)
+    return (book, trades, events)
 
 @pytest.fixture(scope='session')
-def check_version():
+def check_version(pytestconfig):
     """
-    Session-scoped fixture to check library version compatibility
-    Runs once at the start of the test session
+    Session-scoped fixture with the library version
+    Returns the (major, minor, patch) read once in pytest_configure,
+    which also refuses to run against an incompatible library
     """
-    version = lib.mx_get_version()
-    major = (version >> 16) & 0xFF
-    minor = (version >> 8) & 0xFF
-    patch = version & 0xFF
-    
-    print(f"\nMatchX Library Version: {major}.{minor}.{patch}")
-    
-    # Check compatibility
-    is_compatible = lib.mx_is_compatible_dll()
-    assert is_compatible, "Library version is not compatible with header"
-    
-    return version
+    return pytestconfig._matchx_version
 
-@pytest.fixture(autouse=True, scope='session')
-def setup_session(check_version):
+def pytest_configure(config):
     """
-    Auto-use fixture that runs once per session
-    Prints library information
+    Print library information (markers are registered in pytest.ini)
+    Stops the run before collection if the library is not compatible
+    with the header the tests were built against
     """
+    raw = lib.mx_get_version()
+    version = Version((raw >> 16) & 0xFF, (raw >> 8) & 0xFF, raw & 0xFF)
+    is_compatible = lib.mx_is_compatible_dll()
+    if not is_compatible:
+        raise pytest.UsageError(
+            f"MatchX library {version.major}.{version.minor}.{version.patch} "
+            "is not compatible with the header; rebuild it (./build.sh --build)"
+        )
+    config._matchx_version = version
+    
     print("\n" + "="*60)
     print("MatchX Matching Engine Test Suite")
+    print(f"MatchX Library Version: {version.major}.{version.minor}.{version.patch}")
     print("="*60)
 
-# Markers for organizing tests
-def pytest_configure(config):
-    """Configure custom pytest markers"""
-    config.addinivalue_line(
-        "markers", "slow: marks tests as slow (deselect with '-m \"not slow\"')"
-    )
-    config.addinivalue_line(
-        "markers", "performance: marks performance/benchmark tests"
-    )
-    config.addinivalue_line(
-        "markers", "integration: marks integration tests"
-    )
-    config.addinivalue_line(
-        "markers", "stress: marks stress tests with many orders"
-    )
+def pytest_collection_modifyitems(config, items):
+    """
+    Under pytest-xdist (--dist loadgroup), keep each test class on one
+    worker so it runs against that worker's session context and books
+    """
+    if not config.pluginmanager.hasplugin("xdist"):
+        return
+    
+    for item in items:
+        group = item.cls.__name__ if item.cls else item.module.__name__
+        item.add_marker(pytest.mark.xdist_group(name=group))
@@ -3,25 +3,45 @@ Basic functionality tests
 Tests context creation, order books, and simple order operations
 """
 
+import functools
 import pytest
+import testhelpers
 from testhelpers import (
     ffi, lib,
+    create_order_book, free_order_book, add_limit_batch, add_limit_same_level, cancel_many, replay,
+    SYM_TEST, SYM_AAPL,
     SIDE_BUY, SIDE_SELL,
-    STATUS_OK, STATUS_ORDER_NOT_FOUND, STATUS_DUPLICATE_ORDER,
-    price_to_ticks, ticks_to_price
+    STATUS_OK, STATUS_ORDER_NOT_FOUND, STATUS_DUPLICATE_ORDER, STATUS_INVALID_QUANTITY,
+    EVENT_ACCEPTED,
+    ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET,
+    TIF_GTC, TIF_IOC, TIF_FOK,
+    OP_ADD_LIMIT, OP_ADD_MARKET, OP_CANCEL,
+    price_to_ticks, ticks_to_price,
+    create_trade_callback, create_order_callback
 )
 
+# Tick values of every price used below, converted once at import
+_P = {p: price_to_ticks(p) for p in (
+    1.00, 98.00, 98.50, 99.00, 99.50, 100.00, 100.50, 101.00, 101.50, 102.00
+)}
+
+@functools.lru_cache(maxsize=64)
+def _static_c_string(address):
+    return ffi.string(ffi.cast("const char*", address))
+
+def _c_string(p):
+    """
+    ffi.string() for the library's static strings (status messages,
+    order type and TIF names), cached by address
+    """
+    return _static_c_string(int(ffi.cast("uintptr_t", p)))
+
 class TestVersionAndCompatibility:
     """Test version information"""
     
-    def test_get_version(self):
+    def test_get_version(self, check_version):
         """Test that we can get library version"""
-        version = lib.mx_get_version()
-        assert version > 0
-        
-        major = (version >> 16) & 0xFF
-        minor = (version >> 8) & 0xFF
-        patch = version & 0xFF
+        major, minor, patch = check_version
         
         # Should be version 1.0.0
         assert major == 1
@@ -32,6 +52,23 @@ class TestVersionAndCompatibility:
         """Test DLL compatibility check"""
         is_compatible = lib.mx_is_compatible_dll()
         assert is_compatible == 1
+    
+    def test_constants_match_header(self):
+        """The constants testhelpers hard-codes equal the header's enum values"""
+        c_prefixes = {
+            'SIDE_': 'MX_SIDE_', 'ORDER_TYPE_': 'MX_ORDER_TYPE_', 'TIF_': 'MX_TIF_',
+            'FLAG_': 'MX_ORDER_FLAG_', 'STATUS_': 'MX_STATUS_',
+            'EVENT_': 'MX_EVENT_ORDER_', 'OP_': 'MX_OP_',
+        }
+        mismatched = {}
+        for attr, value in vars(testhelpers).items():
+            prefix = next((p for p in c_prefixes if attr.startswith(p)), None)
+            if prefix is None or not isinstance(value, int):
+                continue
+            c_value = getattr(lib, c_prefixes[prefix] + attr[len(prefix):])
+            if c_value != value:
+                mismatched[attr] = (value, c_value)
+        assert not mismatched
 
 class TestContext:
     """Test context management"""
@@ -53,13 +90,31 @@ class TestContext:
     def test_callbacks_without_crash(self, context):
         """Test that setting NULL callbacks doesn't crash"""
         lib.mx_context_set_callbacks(context, ffi.NULL, ffi.NULL, ffi.NULL)
+    
+    def test_callback_reused_for_bound_method(self, context, order_book):
+        """Test that wrapping the same bound method twice reuses its callback"""
+        class Counter:
+            def __init__(self):
+                self.calls = 0
+            
+            def record(self, *args):
+                self.calls += 1
+        
+        counter = Counter()
+        on_order = create_order_callback(counter.record)
+        assert create_order_callback(counter.record) is on_order
+        assert create_trade_callback(counter.record) is not on_order
+        
+        lib.mx_context_set_callbacks(context, ffi.NULL, on_order, ffi.NULL)
+        lib.mx_order_book_add_limit(order_book, 1, SIDE_BUY, _P[100.00], 100)
+        assert counter.calls == 1
 
 class TestOrderBook:
     """Test order book management"""
     
     def test_create_and_free_order_book(self, context):
         """Test basic order book lifecycle"""
-        book = lib.mx_order_book_new(context, b"AAPL")
+        book = lib.mx_order_book_new(context, SYM_AAPL)
         assert book != ffi.NULL
         lib.mx_order_book_free(book)
     
@@ -83,121 +138,181 @@ class TestOrderBook:
     def test_clear_empty_book(self, order_book):
         """Test clearing an empty book doesn't crash"""
         lib.mx_order_book_clear(order_book)
-
-class TestLimitOrders:
-    """Test limit order operations"""
     
-    def test_add_single_bid(self, order_book):
-        """Test adding a single buy limit order"""
-        result = lib.mx_order_book_add_limit(
-            order_book, 
-            1,  # order_id
-            SIDE_BUY, 
-            price_to_ticks(100.00), 
-            50  # quantity
-        )
+    def test_reset_empties_book(self, order_book):
+        """Test reset removes resting orders and the book is reusable"""
+        lib.mx_order_book_add_limit(order_book, 1, SIDE_BUY, _P[100.00], 100)
+        lib.mx_order_book_reset(order_book)
         
-        assert result == STATUS_OK
-        
-        # Check best bid is set
-        best_bid = lib.mx_order_book_get_best_bid(order_book)
-        assert best_bid == price_to_ticks(100.00)
-    
-    def test_add_single_ask(self, order_book):
-        """Test adding a single sell limit order"""
-        result = lib.mx_order_book_add_limit(
-            order_book,
-            1,
-            SIDE_SELL,
-            price_to_ticks(101.00),
-            50
-        )
+        assert lib.mx_order_book_has_order(order_book, 1) == 0
+        assert lib.mx_order_book_get_best_bid(order_book) == 0
         
+        # The same order ID can be reused after a reset
+        result = lib.mx_order_book_add_limit(order_book, 1, SIDE_BUY, _P[100.00], 100)
         assert result == STATUS_OK
-        
-        # Check best ask is set
-        best_ask = lib.mx_order_book_get_best_ask(order_book)
-        assert best_ask == price_to_ticks(101.00)
+
+@pytest.fixture(scope='class')
+def class_book(context):
+    """Order book reused by every test in a class"""
+    book = create_order_book(context, SYM_TEST)
+    assert book != ffi.NULL, "Failed to create order book"
     
-    def test_add_multiple_bids(self, order_book):
-        """Test adding multiple buy orders at different prices"""
-        prices = [99.50, 100.00, 98.50]
-        
-        for i, price in enumerate(prices):
-            result = lib.mx_order_book_add_limit(
-                order_book,
-                i + 1,
-                SIDE_BUY,
-                price_to_ticks(price),
-                100
-            )
-            assert result == STATUS_OK
-        
-        # Best bid should be highest price
-        best_bid = lib.mx_order_book_get_best_bid(order_book)
-        assert best_bid == price_to_ticks(100.00)
+    yield book
+    
+    free_order_book(book)
+
+class TestLimitOrdersParametrized:
+    """Test resting limit orders against one book shared by the class"""
     
-    def test_add_multiple_asks(self, order_book):
-        """Test adding multiple sell orders at different prices"""
-        prices = [101.00, 100.50, 101.50]
+    @pytest.mark.parametrize("side,prices,expected_best", [
+        (SIDE_BUY, [100.00], 100.00),
+        (SIDE_SELL, [101.00], 101.00),
+        (SIDE_BUY, [99.50, 100.00, 98.50], 100.00),
+        (SIDE_SELL, [101.00, 100.50, 101.50], 100.50),
+    ], ids=['single_bid', 'single_ask', 'multiple_bids', 'multiple_asks'])
+    def test_add_sets_best_price(self, class_book, side, prices, expected_best):
+        """Test that the best price is the highest bid / lowest ask added"""
+        lib.mx_order_book_clear(class_book)
         
         for i, price in enumerate(prices):
             result = lib.mx_order_book_add_limit(
-                order_book,
-                i + 1,
-                SIDE_SELL,
-                price_to_ticks(price),
-                100
+                class_book, i + 1, side, _P[price], 100
             )
             assert result == STATUS_OK
         
-        # Best ask should be lowest price
-        best_ask = lib.mx_order_book_get_best_ask(order_book)
-        assert best_ask == price_to_ticks(100.50)
+        if side == SIDE_BUY:
+            best = lib.mx_order_book_get_best_bid(class_book)
+        else:
+            best = lib.mx_order_book_get_best_ask(class_book)
+        assert best == _P[expected_best]
+
+class TestLimitOrders:
+    """Test limit order operations"""
     
     def test_duplicate_order_id(self, order_book):
         """Test that duplicate order IDs are rejected"""
         # Add first order
         result = lib.mx_order_book_add_limit(
-            order_book, 1, SIDE_BUY, price_to_ticks(100.00), 50
+            order_book, 1, SIDE_BUY, _P[100.00], 50
         )
         assert result == STATUS_OK
         
         # Try to add with same ID
         result = lib.mx_order_book_add_limit(
-            order_book, 1, SIDE_SELL, price_to_ticks(101.00), 50
+            order_book, 1, SIDE_SELL, _P[101.00], 50
         )
         assert result == STATUS_DUPLICATE_ORDER
     
+    def test_add_limit_batch(self, order_book):
+        """Test batch add matches one-at-a-time adds and reports per-order status"""
+        results = ffi.new("int[4]")
+        accepted = add_limit_batch(order_book, [
+            (1, SIDE_BUY, _P[99.00], 50),
+            (2, SIDE_BUY, _P[100.00], 30),
+            (1, SIDE_SELL, _P[101.00], 20),  # duplicate ID
+            (3, SIDE_SELL, _P[101.00], 40),
+        ], results)
+        
+        assert accepted == 3
+        assert list(results) == [STATUS_OK, STATUS_OK, STATUS_DUPLICATE_ORDER, STATUS_OK]
+        assert lib.mx_order_book_get_best_bid(order_book) == _P[100.00]
+        assert lib.mx_order_book_get_best_ask(order_book) == _P[101.00]
+        assert lib.mx_order_book_get_volume_at_price(order_book, SIDE_SELL, _P[101.00]) == 40
+    
+    def test_add_limit_same_level(self, order_book):
+        """Test adding several orders at one price level in a single call"""
+        results = ffi.new("int[4]")
+        accepted = add_limit_same_level(
+            order_book, SIDE_BUY, _P[100.00], [1, 2, 1, 3], [50, 30, 20, 0], results
+        )
+        
+        assert accepted == 2
+        assert list(results) == [STATUS_OK, STATUS_OK, STATUS_DUPLICATE_ORDER,
+                                 STATUS_INVALID_QUANTITY]
+        assert lib.mx_order_book_get_best_bid(order_book) == _P[100.00]
+        assert lib.mx_order_book_get_volume_at_price(order_book, SIDE_BUY, _P[100.00]) == 80
+    
+    def test_add_limit_same_level_best_in_callback(self, context, order_book):
+        """Test order callbacks from a same-level batch see the new best price"""
+        lib.mx_order_book_add_limit(order_book, 1, SIDE_BUY, _P[99.00], 10)
+        lib.mx_order_book_add_limit(order_book, 2, SIDE_SELL, _P[102.00], 10)
+        seen = []
+        
+        def on_order(order_id, event, filled_qty, remaining_qty):
+            if event == EVENT_ACCEPTED:
+                seen.append((order_id,
+                             lib.mx_order_book_get_best_bid(order_book),
+                             lib.mx_order_book_get_best_ask(order_book)))
+        
+        lib.mx_context_set_callbacks(context, ffi.NULL, create_order_callback(on_order), ffi.NULL)
+        add_limit_same_level(order_book, SIDE_BUY, _P[100.00], [3, 4], [50, 30])
+        add_limit_same_level(order_book, SIDE_SELL, _P[101.00], [5, 6], [50, 30])
+        
+        assert seen == [
+            (3, _P[100.00], _P[102.00]),
+            (4, _P[100.00], _P[102.00]),
+            (5, _P[100.00], _P[101.00]),
+            (6, _P[100.00], _P[101.00]),
+        ]
+    
+    def test_replay(self, order_book):
+        """Test replaying a recorded tape of adds and cancels"""
+        results = ffi.new("int[5]")
+        succeeded = replay(order_book, [
+            (1, OP_ADD_LIMIT, SIDE_BUY, _P[99.00], 50),
+            (2, OP_ADD_LIMIT, SIDE_SELL, _P[101.00], 30),
+            (1, OP_CANCEL, SIDE_BUY, 0, 0),
+            (1, OP_CANCEL, SIDE_BUY, 0, 0),  # already gone
+            (3, OP_ADD_MARKET, SIDE_BUY, 0, 10),
+        ], results)
+        
+        assert succeeded == 4
+        assert list(results) == [STATUS_OK, STATUS_OK, STATUS_OK,
+                                 STATUS_ORDER_NOT_FOUND, STATUS_OK]
+        assert lib.mx_order_book_get_best_bid(order_book) == 0
+        assert lib.mx_order_book_get_volume_at_price(order_book, SIDE_SELL, _P[101.00]) == 20
+    
+    def test_add_limit_same_level_crossing(self, order_book):
+        """Test a same-level batch that crosses the book still matches"""
+        lib.mx_order_book_add_limit(order_book, 1, SIDE_SELL, _P[100.00], 40)
+        
+        accepted = add_limit_same_level(order_book, SIDE_BUY, _P[100.00], [2, 3], [30, 30])
+        
+        assert accepted == 2
+        assert lib.mx_order_book_has_order(order_book, 1) == 0
+        assert lib.mx_order_book_has_order(order_book, 2) == 0
+        assert lib.mx_order_book_get_best_bid(order_book) == _P[100.00]
+        assert lib.mx_order_book_get_volume_at_price(order_book, SIDE_BUY, _P[100.00]) == 20
+    
     def test_spread_calculation(self, order_book):
         """Test spread calculation with bid and ask"""
         # Add bid at $100
         lib.mx_order_book_add_limit(
-            order_book, 1, SIDE_BUY, price_to_ticks(100.00), 50
+            order_book, 1, SIDE_BUY, _P[100.00], 50
         )
         
         # Add ask at $101
         lib.mx_order_book_add_limit(
-            order_book, 2, SIDE_SELL, price_to_ticks(101.00), 50
+            order_book, 2, SIDE_SELL, _P[101.00], 50
         )
         
         spread = lib.mx_order_book_get_spread(order_book)
-        assert spread == price_to_ticks(1.00)  # $1.00 spread
+        assert spread == _P[1.00]  # $1.00 spread
     
     def test_mid_price(self, order_book):
         """Test mid price calculation"""
         # Add bid at $100
         lib.mx_order_book_add_limit(
-            order_book, 1, SIDE_BUY, price_to_ticks(100.00), 50
+            order_book, 1, SIDE_BUY, _P[100.00], 50
         )
         
         # Add ask at $102
         lib.mx_order_book_add_limit(
-            order_book, 2, SIDE_SELL, price_to_ticks(102.00), 50
+            order_book, 2, SIDE_SELL, _P[102.00], 50
         )
         
         mid = lib.mx_order_book_get_mid_price(order_book)
-        assert mid == price_to_ticks(101.00)  # Average of $100 and $102
+        assert mid == _P[101.00]  # Average of $100 and $102
 
 class TestOrderCancellation:
     """Test order cancellation"""
@@ -206,7 +321,7 @@ class TestOrderCancellation:
         """Test cancelling an order that exists"""
         # Add order
         lib.mx_order_book_add_limit(
-            order_book, 1, SIDE_BUY, price_to_ticks(100.00), 50
+            order_book, 1, SIDE_BUY, _P[100.00], 50
         )
         
         # Cancel it
@@ -222,24 +337,35 @@ class TestOrderCancellation:
         result = lib.mx_order_book_cancel(order_book, 999)
         assert result == STATUS_ORDER_NOT_FOUND
     
+    def test_cancel_many(self, order_book):
+        """Test cancelling several orders in one call, with per-order status"""
+        add_limit_same_level(order_book, SIDE_BUY, _P[100.00], [1, 2, 3], [100] * 3)
+        
+        results = ffi.new("int[]", 3)
+        assert cancel_many(order_book, [1, 999, 3], results) == 2
+        assert list(results) == [STATUS_OK, STATUS_ORDER_NOT_FOUND, STATUS_OK]
+        
+        assert lib.mx_order_book_has_order(order_book, 2) == 1
+        assert lib.mx_order_book_has_order(order_book, 3) == 0
+    
     def test_cancel_updates_best_prices(self, order_book):
         """Test that cancelling best bid/ask updates prices correctly"""
         # Add two bids
         lib.mx_order_book_add_limit(
-            order_book, 1, SIDE_BUY, price_to_ticks(100.00), 50
+            order_book, 1, SIDE_BUY, _P[100.00], 50
         )
         lib.mx_order_book_add_limit(
-            order_book, 2, SIDE_BUY, price_to_ticks(99.00), 50
+            order_book, 2, SIDE_BUY, _P[99.00], 50
         )
         
         # Best bid should be $100
-        assert lib.mx_order_book_get_best_bid(order_book) == price_to_ticks(100.00)
+        assert lib.mx_order_book_get_best_bid(order_book) == _P[100.00]
         
         # Cancel best bid
         lib.mx_order_book_cancel(order_book, 1)
         
         # Best bid should now be $99
-        assert lib.mx_order_book_get_best_bid(order_book) == price_to_ticks(99.00)
+        assert lib.mx_order_book_get_best_bid(order_book) == _P[99.00]
 
 class TestOrderQueries:
     """Test order query functions"""
@@ -251,7 +377,7 @@ class TestOrderQueries:
         
         # Add order
         lib.mx_order_book_add_limit(
-            order_book, 1, SIDE_BUY, price_to_ticks(100.00), 50
+            order_book, 1, SIDE_BUY, _P[100.00], 50
         )
         
         # Should exist now
@@ -263,11 +389,11 @@ class TestOrderQueries:
         # Should not exist anymore
         assert lib.mx_order_book_has_order(order_book, 1) == 0
     
-    def test_get_order_info(self, order_book):
+    def test_get_order_info(self, order_book, out_ptrs):
         """Test retrieving order information"""
         # Add order
         order_id = 1
-        price = price_to_ticks(100.50)
+        price = _P[100.50]
         quantity = 75
         
         lib.mx_order_book_add_limit(
@@ -275,65 +401,52 @@ class TestOrderQueries:
         )
         
         # Query order info
-        side_out = ffi.new("mx_side_t*")
-        price_out = ffi.new("uint32_t*")
-        quantity_out = ffi.new("uint32_t*")
-        filled_out = ffi.new("uint32_t*")
-        
         result = lib.mx_order_book_get_order_info(
             order_book, order_id,
-            side_out, price_out, quantity_out, filled_out
+            out_ptrs.side, out_ptrs.price, out_ptrs.qty, out_ptrs.filled
         )
         
         assert result == STATUS_OK
-        assert side_out[0] == SIDE_BUY
-        assert price_out[0] == price
-        assert quantity_out[0] == quantity
-        assert filled_out[0] == 0  # Not filled yet
+        assert out_ptrs.side[0] == SIDE_BUY
+        assert out_ptrs.price[0] == price
+        assert out_ptrs.qty[0] == quantity
+        assert out_ptrs.filled[0] == 0  # Not filled yet
 
 class TestOrderBookStats:
     """Test order book statistics"""
     
-    def test_empty_book_stats(self, order_book):
+    def test_empty_book_stats(self, order_book, out_ptrs):
         """Test stats on empty book"""
-        total_orders = ffi.new("uint32_t*")
-        bid_levels = ffi.new("uint32_t*")
-        ask_levels = ffi.new("uint32_t*")
-        
         lib.mx_order_book_get_stats(
-            order_book, total_orders, bid_levels, ask_levels, ffi.NULL, ffi.NULL
+            order_book, out_ptrs.total, out_ptrs.bids, out_ptrs.asks, ffi.NULL, ffi.NULL
         )
         
-        assert total_orders[0] == 0
-        assert bid_levels[0] == 0
-        assert ask_levels[0] == 0
+        assert out_ptrs.total[0] == 0
+        assert out_ptrs.bids[0] == 0
+        assert out_ptrs.asks[0] == 0
     
-    def test_populated_book_stats(self, order_book):
+    def test_populated_book_stats(self, order_book, out_ptrs):
         """Test stats on populated book"""
         # Add 3 bid levels
-        lib.mx_order_book_add_limit(order_book, 1, SIDE_BUY, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(order_book, 2, SIDE_BUY, price_to_ticks(99.00), 50)
-        lib.mx_order_book_add_limit(order_book, 3, SIDE_BUY, price_to_ticks(98.00), 50)
+        lib.mx_order_book_add_limit(order_book, 1, SIDE_BUY, _P[100.00], 50)
+        lib.mx_order_book_add_limit(order_book, 2, SIDE_BUY, _P[99.00], 50)
+        lib.mx_order_book_add_limit(order_book, 3, SIDE_BUY, _P[98.00], 50)
         
         # Add 2 ask levels
-        lib.mx_order_book_add_limit(order_book, 4, SIDE_SELL, price_to_ticks(101.00), 50)
-        lib.mx_order_book_add_limit(order_book, 5, SIDE_SELL, price_to_ticks(102.00), 50)
-        
-        total_orders = ffi.new("uint32_t*")
-        bid_levels = ffi.new("uint32_t*")
-        ask_levels = ffi.new("uint32_t*")
+        lib.mx_order_book_add_limit(order_book, 4, SIDE_SELL, _P[101.00], 50)
+        lib.mx_order_book_add_limit(order_book, 5, SIDE_SELL, _P[102.00], 50)
         
         lib.mx_order_book_get_stats(
-            order_book, total_orders, bid_levels, ask_levels, ffi.NULL, ffi.NULL
+            order_book, out_ptrs.total, out_ptrs.bids, out_ptrs.asks, ffi.NULL, ffi.NULL
         )
         
-        assert total_orders[0] == 5
-        assert bid_levels[0] == 3
-        assert ask_levels[0] == 2
+        assert out_ptrs.total[0] == 5
+        assert out_ptrs.bids[0] == 3
+        assert out_ptrs.asks[0] == 2
     
     def test_volume_at_price(self, order_book):
         """Test getting volume at specific price"""
-        price = price_to_ticks(100.00)
+        price = _P[100.00]
         
         # Initially 0
         volume = lib.mx_order_book_get_volume_at_price(order_book, SIDE_BUY, price)
@@ -351,15 +464,15 @@ class TestOrderBookStats:
 class TestClearBook:
     """Test clearing the order book"""
     
-    def test_clear_removes_all_orders(self, order_book):
+    def test_clear_removes_all_orders(self, order_book, out_ptrs):
         """Test that clear removes all orders"""
         # Add several orders
-        lib.mx_order_book_add_limit(order_book, 1, SIDE_BUY, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(order_book, 2, SIDE_BUY, price_to_ticks(99.00), 50)
-        lib.mx_order_book_add_limit(order_book, 3, SIDE_SELL, price_to_ticks(101.00), 50)
+        lib.mx_order_book_add_limit(order_book, 1, SIDE_BUY, _P[100.00], 50)
+        lib.mx_order_book_add_limit(order_book, 2, SIDE_BUY, _P[99.00], 50)
+        lib.mx_order_book_add_limit(order_book, 3, SIDE_SELL, _P[101.00], 50)
         
         # Verify they exist
-        total_orders = ffi.new("uint32_t*")
+        total_orders = out_ptrs.total
         lib.mx_order_book_get_stats(order_book, total_orders, ffi.NULL, ffi.NULL, ffi.NULL, ffi.NULL)
         assert total_orders[0] == 3
         
@@ -378,30 +491,33 @@ class TestUtilityFunctions:
     def test_status_messages(self):
         """Test getting human-readable status messages"""
         msg = lib.mx_status_message(STATUS_OK)
-        assert ffi.string(msg) == b"Success"
+        assert _c_string(msg) == b"Success"
         
         msg = lib.mx_status_message(STATUS_ORDER_NOT_FOUND)
-        assert b"not found" in ffi.string(msg).lower()
+        assert b"not found" in _c_string(msg).lower()
     
     def test_order_type_names(self):
         """Test getting order type names"""
-        from testhelpers import ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET
-        
         name = lib.mx_order_type_name(ORDER_TYPE_LIMIT)
-        assert ffi.string(name) == b"LIMIT"
+        assert _c_string(name) == b"LIMIT"
         
         name = lib.mx_order_type_name(ORDER_TYPE_MARKET)
-        assert ffi.string(name) == b"MARKET"
+        assert _c_string(name) == b"MARKET"
     
     def test_tif_names(self):
         """Test getting time-in-force names"""
-        from testhelpers import TIF_GTC, TIF_IOC, TIF_FOK
-        
         name = lib.mx_tif_name(TIF_GTC)
-        assert ffi.string(name) == b"GTC"
+        assert _c_string(name) == b"GTC"
         
         name = lib.mx_tif_name(TIF_IOC)
-        assert ffi.string(name) == b"IOC"
+        assert _c_string(name) == b"IOC"
         
         name = lib.mx_tif_name(TIF_FOK)
-        assert ffi.string(name) == b"FOK"
+        assert _c_string(name) == b"FOK"
+    
+    def test_price_conversion(self):
+        """Test price <-> tick conversion rounds to the nearest tick"""
+        assert price_to_ticks(100.50) == 10050
+        assert price_to_ticks(1.15) == 115
+        assert price_to_ticks(0.29) == 29
+        assert ticks_to_price(10050) == 100.50
@@ -6,13 +6,30 @@ Tests order matching, price-time priority, partial fills, and trade execution
 import pytest
 from testhelpers import (
     ffi, lib,
+    add_limit_batch, add_limit_same_level, get_order_qty, get_order_qtys, assert_trades_equal,
     SIDE_BUY, SIDE_SELL,
     ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET,
-    STATUS_OK,
+    STATUS_OK, STATUS_INVALID_QUANTITY, STATUS_INVALID_PRICE,
     EVENT_FILLED, EVENT_PARTIAL, EVENT_ACCEPTED,
     price_to_ticks, ticks_to_price
 )
 
+# Library entry points used below, bound once
+_add_limit = lib.mx_order_book_add_limit
+_add_market = lib.mx_order_book_add_market
+_has_order = lib.mx_order_book_has_order
+_get_best_ask = lib.mx_order_book_get_best_ask
+
+# Tick values of every price used below, converted once at import
+TICKS = {p: price_to_ticks(p) for p in (99.00, 100.00, 101.00, 101.50, 102.00)}
+
+# (price, quantity) fills expected from test_market_order_walks_book
+_WALK_BOOK_TRADES = (
+    (TICKS[100.00], 30),
+    (TICKS[101.00], 30),
+    (TICKS[102.00], 10),
+)
+
 class TestBasicMatching:
     """Test basic order matching"""
     
@@ -21,81 +38,79 @@ class TestBasicMatching:
         book, trades, events = book_with_callbacks
         
         # Add a sell order at $100
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 1, SIDE_SELL, TICKS[100.00], 50)
         
         # Add a buy order at $100 - should match
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 2, SIDE_BUY, TICKS[100.00], 50)
         
         # Should have exactly 1 trade
         assert trades.count() == 1
         
         trade = trades.get_last()
-        assert trade['aggressive_id'] == 2  # Buy was aggressive
-        assert trade['passive_id'] == 1    # Sell was passive
-        assert trade['price'] == price_to_ticks(100.00)
-        assert trade['quantity'] == 50
+        assert trade.aggressive_id == 2  # Buy was aggressive
+        assert trade.passive_id == 1    # Sell was passive
+        assert trade.price == TICKS[100.00]
+        assert trade.quantity == 50
     
     def test_no_match_different_prices(self, book_with_callbacks):
         """Test that orders at different prices don't match"""
         book, trades, events = book_with_callbacks
         
         # Add sell at $101
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(101.00), 50)
+        _add_limit(book, 1, SIDE_SELL, TICKS[101.00], 50)
         
         # Add buy at $100 - should NOT match
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 2, SIDE_BUY, TICKS[100.00], 50)
         
         # No trades should occur
         assert trades.count() == 0
         
-        # Both orders should be in book
-        assert lib.mx_order_book_has_order(book, 1) == 1
-        assert lib.mx_order_book_has_order(book, 2) == 1
+        # Both orders should be in book, untouched
+        assert get_order_qtys(book, [1, 2]) == [50, 50]
     
     def test_match_crosses_spread(self, book_with_callbacks):
         """Test that aggressive order crosses the spread"""
         book, trades, events = book_with_callbacks
         
         # Add sell at $100
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 1, SIDE_SELL, TICKS[100.00], 50)
         
         # Add buy at $102 - should match at sell price ($100)
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(102.00), 50)
+        _add_limit(book, 2, SIDE_BUY, TICKS[102.00], 50)
         
         # Should match at passive order's price
         assert trades.count() == 1
         trade = trades.get_last()
-        assert trade['price'] == price_to_ticks(100.00)  # Seller's price, not buyer's
+        assert trade.price == TICKS[100.00]  # Seller's price, not buyer's
     
-    def test_buy_matches_sell(self, book_with_callbacks):
-        """Test buy matching against existing sell"""
+    @pytest.mark.parametrize("passive,aggressive", [
+        (SIDE_SELL, SIDE_BUY),
+        (SIDE_BUY, SIDE_SELL),
+    ], ids=['buy_matches_sell', 'sell_matches_buy'])
+    def test_aggressor_matches_resting(self, book_with_callbacks, passive, aggressive):
+        """Test an incoming order matching a resting order on the other side"""
         book, trades, events = book_with_callbacks
         
-        # Add sell first
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 50)
-        trades.clear()  # Clear the acceptance event
+        # Add resting order first
+        _add_limit(book, 1, passive, TICKS[100.00], 50)
+        trades.clear()
         
-        # Add matching buy
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(100.00), 50)
+        # Add matching order from the other side
+        _add_limit(book, 2, aggressive, TICKS[100.00], 50)
         
         assert trades.count() == 1
-        assert trades.get_last()['aggressive_id'] == 2
-        assert trades.get_last()['passive_id'] == 1
+        assert trades.get_last().aggressive_id == 2
+        assert trades.get_last().passive_id == 1
     
-    def test_sell_matches_buy(self, book_with_callbacks):
-        """Test sell matching against existing buy"""
-        book, trades, events = book_with_callbacks
-        
-        # Add buy first
-        lib.mx_order_book_add_limit(book, 1, SIDE_BUY, price_to_ticks(100.00), 50)
-        trades.clear()
+    def test_native_recorder_captures_trade(self, native_trade_book):
+        """Test the library-side recorder captures a trade"""
+        book, trades = native_trade_book
         
-        # Add matching sell
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 1, SIDE_SELL, TICKS[100.00], 10)
+        _add_limit(book, 2, SIDE_BUY, TICKS[100.00], 10)
         
-        assert trades.count() == 1
-        assert trades.get_last()['aggressive_id'] == 2
-        assert trades.get_last()['passive_id'] == 1
+        assert_trades_equal(trades, [(2, 1, TICKS[100.00], 10)],
+                            fields=('aggressive_id', 'passive_id', 'price', 'quantity'))
 
 class TestPartialFills:
     """Test partial order fills"""
@@ -105,58 +120,52 @@ class TestPartialFills:
         book, trades, events = book_with_callbacks
         
         # Add sell for 50
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 1, SIDE_SELL, TICKS[100.00], 50)
         events.clear()
         
         # Add buy for 100 - should partially fill
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(100.00), 100)
+        _add_limit(book, 2, SIDE_BUY, TICKS[100.00], 100)
         
         # Should have 1 trade for 50
         assert trades.count() == 1
-        assert trades.get_last()['quantity'] == 50
+        assert trades.get_last().quantity == 50
         
         # Aggressive order should be partially filled
-        order_events = events.get_for_order(2)
-        assert any(e['event'] == EVENT_PARTIAL for e in order_events)
+        assert events.has_event(2, EVENT_PARTIAL)
         
         # Remaining 50 should be in book
-        qty_out = ffi.new("uint32_t*")
-        lib.mx_order_book_get_order_info(book, 2, ffi.NULL, ffi.NULL, qty_out, ffi.NULL)
-        assert qty_out[0] == 50  # Remaining quantity
+        assert get_order_qty(book, 2) == 50  # Remaining quantity
     
     def test_partial_fill_passive(self, book_with_callbacks):
         """Test passive order partially filled"""
         book, trades, events = book_with_callbacks
         
         # Add sell for 100
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 100)
+        _add_limit(book, 1, SIDE_SELL, TICKS[100.00], 100)
         events.clear()
         
         # Add buy for 50 - should partially fill passive
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 2, SIDE_BUY, TICKS[100.00], 50)
         
         # Trade for 50
         assert trades.count() == 1
-        assert trades.get_last()['quantity'] == 50
+        assert trades.get_last().quantity == 50
         
         # Passive order (1) should still be in book with 50 remaining
-        qty_out = ffi.new("uint32_t*")
-        lib.mx_order_book_get_order_info(book, 1, ffi.NULL, ffi.NULL, qty_out, ffi.NULL)
-        assert qty_out[0] == 50
+        assert get_order_qty(book, 1) == 50
     
     def test_multiple_partial_fills(self, book_with_callbacks):
         """Test order getting filled in multiple chunks"""
         book, trades, events = book_with_callbacks
         
         # Add large sell order
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 200)
+        _add_limit(book, 1, SIDE_SELL, TICKS[100.00], 200)
         trades.clear()
         
         # Fill it in chunks
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(book, 3, SIDE_BUY, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(book, 4, SIDE_BUY, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(book, 5, SIDE_BUY, price_to_ticks(100.00), 50)
+        add_limit_batch(book, [
+            (oid, SIDE_BUY, TICKS[100.00], 50) for oid in (2, 3, 4, 5)
+        ])
         
         # Should have 4 trades
         assert trades.count() == 4
@@ -165,7 +174,7 @@ class TestPartialFills:
         assert trades.total_volume() == 200
         
         # Order 1 should be completely filled
-        assert lib.mx_order_book_has_order(book, 1) == 0
+        assert _has_order(book, 1) == 0
 
 class TestPriceTimePriority:
     """Test price-time priority matching"""
@@ -175,150 +184,122 @@ class TestPriceTimePriority:
         book, trades, events = book_with_callbacks
         
         # Add two sell orders at different prices
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(101.00), 50)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 50)
+        add_limit_batch(book, [
+            (1, SIDE_SELL, TICKS[101.00], 50),
+            (2, SIDE_SELL, TICKS[100.00], 50),
+        ])
         trades.clear()
         
         # Add buy that can match both - should match better price first
-        lib.mx_order_book_add_limit(book, 3, SIDE_BUY, price_to_ticks(101.00), 50)
+        _add_limit(book, 3, SIDE_BUY, TICKS[101.00], 50)
         
         # Should match with order 2 (lower price)
         assert trades.count() == 1
-        assert trades.get_last()['passive_id'] == 2
-        assert trades.get_last()['price'] == price_to_ticks(100.00)
+        assert trades.get_last().passive_id == 2
+        assert trades.get_last().price == TICKS[100.00]
     
     def test_time_priority_same_price(self, book_with_callbacks):
         """Test that earlier orders match first at same price"""
         book, trades, events = book_with_callbacks
         
         # Add three sell orders at same price
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 30)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 30)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(100.00), 30)
+        add_limit_same_level(book, SIDE_SELL, TICKS[100.00], [1, 2, 3], [30, 30, 30])
         trades.clear()
         
         # Add buy for 50 - should match orders in time order
-        lib.mx_order_book_add_limit(book, 4, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 4, SIDE_BUY, TICKS[100.00], 50)
         
         # Should have 2 trades
-        assert trades.count() == 2
+        view = trades.view()
+        assert len(view.quantity) == 2
         
-        all_trades = trades.get_all()
         # First trade with order 1 (30 shares)
-        assert all_trades[0]['passive_id'] == 1
-        assert all_trades[0]['quantity'] == 30
+        assert view.passive_id[0] == 1
+        assert view.quantity[0] == 30
         
         # Second trade with order 2 (20 shares to complete 50)
-        assert all_trades[1]['passive_id'] == 2
-        assert all_trades[1]['quantity'] == 20
-        
-        # Order 1 should be gone (fully filled)
-        assert lib.mx_order_book_has_order(book, 1) == 0
+        assert view.passive_id[1] == 2
+        assert view.quantity[1] == 20
         
-        # Order 2 should have 10 remaining
-        qty_out = ffi.new("uint32_t*")
-        lib.mx_order_book_get_order_info(book, 2, ffi.NULL, ffi.NULL, qty_out, ffi.NULL)
-        assert qty_out[0] == 10
-        
-        # Order 3 should still have 30 (untouched)
-        lib.mx_order_book_get_order_info(book, 3, ffi.NULL, ffi.NULL, qty_out, ffi.NULL)
-        assert qty_out[0] == 30
+        # Order 1 gone (fully filled), order 2 has 10 remaining,
+        # order 3 still has 30 (untouched)
+        assert get_order_qtys(book, [1, 2, 3]) == [0, 10, 30]
     
     def test_time_priority_maintained_on_partial_fill(self, book_with_callbacks):
         """Test that partially filled orders maintain time priority"""
         book, trades, events = book_with_callbacks
         
         # Add three orders at same price
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 100)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 100)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(100.00), 100)
+        add_limit_batch(book, [
+            (oid, SIDE_SELL, TICKS[100.00], 100) for oid in (1, 2, 3)
+        ])
         trades.clear()
         
         # Partially fill first order
-        lib.mx_order_book_add_limit(book, 4, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 4, SIDE_BUY, TICKS[100.00], 50)
         
         # Order 1 should have 50 remaining and still be first
-        trades.clear()
-        
-        # Match again
-        lib.mx_order_book_add_limit(book, 5, SIDE_BUY, price_to_ticks(100.00), 30)
+        with trades.scope() as fills:
+            _add_limit(book, 5, SIDE_BUY, TICKS[100.00], 30)
         
         # Should match with order 1's remaining quantity
-        assert trades.count() == 1
-        assert trades.get_last()['passive_id'] == 1
+        assert fills.count() == 1
+        assert fills.get_last().passive_id == 1
 
 class TestMarketOrders:
     """Test market order execution"""
     
-    def test_market_buy_matches_best_ask(self, book_with_callbacks):
-        """Test market buy matches at best ask"""
-        book, trades, events = book_with_callbacks
-        
-        # Add sells at different prices
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(101.00), 50)
-        trades.clear()
-        
-        # Market buy should match best ask
-        lib.mx_order_book_add_market(book, 3, SIDE_BUY, 50)
-        
-        assert trades.count() == 1
-        assert trades.get_last()['price'] == price_to_ticks(100.00)
-        assert trades.get_last()['passive_id'] == 1
-    
-    def test_market_sell_matches_best_bid(self, book_with_callbacks):
-        """Test market sell matches at best bid"""
+    @pytest.mark.parametrize("passive,aggressive,prices", [
+        (SIDE_SELL, SIDE_BUY, (100.00, 101.00)),
+        (SIDE_BUY, SIDE_SELL, (100.00, 99.00)),
+    ], ids=['market_buy_matches_best_ask', 'market_sell_matches_best_bid'])
+    def test_market_matches_best_price(self, book_with_callbacks, passive, aggressive, prices):
+        """Test market order matches at the best opposite price"""
         book, trades, events = book_with_callbacks
         
-        # Add buys at different prices
-        lib.mx_order_book_add_limit(book, 1, SIDE_BUY, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(99.00), 50)
+        # Add resting orders at different prices, best first
+        add_limit_batch(book, [
+            (1, passive, TICKS[prices[0]], 50),
+            (2, passive, TICKS[prices[1]], 50),
+        ])
         trades.clear()
         
-        # Market sell should match best bid
-        lib.mx_order_book_add_market(book, 3, SIDE_SELL, 50)
+        # Market order should match the best price
+        _add_market(book, 3, aggressive, 50)
         
         assert trades.count() == 1
-        assert trades.get_last()['price'] == price_to_ticks(100.00)
-        assert trades.get_last()['passive_id'] == 1
+        assert trades.get_last().price == TICKS[100.00]
+        assert trades.get_last().passive_id == 1
     
     def test_market_order_walks_book(self, book_with_callbacks):
         """Test market order matching through multiple levels"""
         book, trades, events = book_with_callbacks
         
         # Add sells at multiple levels
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 30)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(101.00), 30)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(102.00), 30)
+        _add_limit(book, 1, SIDE_SELL, TICKS[100.00], 30)
+        _add_limit(book, 2, SIDE_SELL, TICKS[101.00], 30)
+        _add_limit(book, 3, SIDE_SELL, TICKS[102.00], 30)
         trades.clear()
         
         # Large market buy walks through levels
-        lib.mx_order_book_add_market(book, 4, SIDE_BUY, 70)
-        
-        # Should have trades at multiple prices
-        assert trades.count() == 3  # 30 + 30 + 10
-        
-        all_trades = trades.get_all()
-        assert all_trades[0]['price'] == price_to_ticks(100.00)
-        assert all_trades[0]['quantity'] == 30
-        assert all_trades[1]['price'] == price_to_ticks(101.00)
-        assert all_trades[1]['quantity'] == 30
-        assert all_trades[2]['price'] == price_to_ticks(102.00)
-        assert all_trades[2]['quantity'] == 10
+        _add_market(book, 4, SIDE_BUY, 70)
+        
+        # Should have trades at multiple prices: 30 + 30 + 10
+        assert_trades_equal(trades, _WALK_BOOK_TRADES)
     
     def test_market_order_no_liquidity(self, book_with_callbacks):
         """Test market order when there's no opposing liquidity"""
         book, trades, events = book_with_callbacks
         
         # Empty book - no asks
-        result = lib.mx_order_book_add_market(book, 1, SIDE_BUY, 50)
+        result = _add_market(book, 1, SIDE_BUY, 50)
         
         # Should succeed but not match anything
         assert result == STATUS_OK
         assert trades.count() == 0
         
         # Market order should not remain in book
-        assert lib.mx_order_book_has_order(book, 1) == 0
+        assert _has_order(book, 1) == 0
 
 class TestMultipleLevelMatching:
     """Test matching across multiple price levels"""
@@ -329,45 +310,49 @@ class TestMultipleLevelMatching:
         
         # Large buy order should match multiple ask levels
         # Populated book has: 200@100.50, 300@101.00, 100@101.50
-        lib.mx_order_book_add_limit(book, 9999, SIDE_BUY, price_to_ticks(102.00), 500)
+        _add_limit(book, 9999, SIDE_BUY, TICKS[102.00], 500)
         
-        # Should match all three levels (200 + 300 = 500)
-        assert trades.count() >= 2
+        # Should fill the first two levels exactly (200 + 300 = 500)
+        assert trades.count() == 2
         
         # Total matched should be 500
         assert trades.total_volume() == 500
+        
+        # Third level is untouched
+        assert _get_best_ask(book) == TICKS[101.50]
     
     def test_order_removal_after_full_fill(self, book_with_callbacks):
         """Test that fully filled orders are removed from book"""
         book, trades, events = book_with_callbacks
         
         # Add order
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 1, SIDE_SELL, TICKS[100.00], 50)
         trades.clear()
         
         # Match it completely
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 2, SIDE_BUY, TICKS[100.00], 50)
         
         # Both orders should be removed
-        assert lib.mx_order_book_has_order(book, 1) == 0
-        assert lib.mx_order_book_has_order(book, 2) == 0
+        assert get_order_qtys(book, [1, 2]) == [0, 0]
     
     def test_best_price_updates_after_match(self, book_with_callbacks):
         """Test that best prices update correctly after matching"""
         book, trades, events = book_with_callbacks
         
         # Add two ask levels
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(101.00), 50)
+        add_limit_batch(book, [
+            (1, SIDE_SELL, TICKS[100.00], 50),
+            (2, SIDE_SELL, TICKS[101.00], 50),
+        ])
         
         # Best ask should be 100
-        assert lib.mx_order_book_get_best_ask(book) == price_to_ticks(100.00)
+        assert _get_best_ask(book) == TICKS[100.00]
         
         # Match first level
-        lib.mx_order_book_add_limit(book, 3, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 3, SIDE_BUY, TICKS[100.00], 50)
         
         # Best ask should now be 101
-        assert lib.mx_order_book_get_best_ask(book) == price_to_ticks(101.00)
+        assert _get_best_ask(book) == TICKS[101.00]
 
 class TestOrderEvents:
     """Test order event callbacks"""
@@ -377,67 +362,59 @@ class TestOrderEvents:
         book, trades, events = book_with_callbacks
         
         # Add order that won't match
-        lib.mx_order_book_add_limit(book, 1, SIDE_BUY, price_to_ticks(99.00), 50)
+        _add_limit(book, 1, SIDE_BUY, TICKS[99.00], 50)
         
         # Should have acceptance event
         order_events = events.get_for_order(1)
         assert len(order_events) > 0
-        assert any(e['event'] == EVENT_ACCEPTED for e in order_events)
+        assert events.has_event(1, EVENT_ACCEPTED)
     
     def test_order_filled_event(self, book_with_callbacks):
         """Test that filled orders trigger event"""
         book, trades, events = book_with_callbacks
         
         # Add passive order
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 1, SIDE_SELL, TICKS[100.00], 50)
         events.clear()
         
         # Match it completely
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 2, SIDE_BUY, TICKS[100.00], 50)
         
         # Both should have filled events
-        order1_events = events.get_for_order(1)
-        order2_events = events.get_for_order(2)
-        
-        assert any(e['event'] == EVENT_FILLED for e in order1_events)
-        assert any(e['event'] == EVENT_FILLED for e in order2_events)
+        assert events.has_event(1, EVENT_FILLED)
+        assert events.has_event(2, EVENT_FILLED)
     
     def test_order_partial_event(self, book_with_callbacks):
         """Test partial fill event"""
         book, trades, events = book_with_callbacks
         
         # Add order
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 100)
+        _add_limit(book, 1, SIDE_SELL, TICKS[100.00], 100)
         events.clear()
         
         # Partially fill it
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 2, SIDE_BUY, TICKS[100.00], 50)
         
         # Should have partial fill event for order 1
-        order1_events = events.get_for_order(1)
-        partial_events = [e for e in order1_events if e['event'] == EVENT_PARTIAL]
+        partial_events = events.get_for_order(1, EVENT_PARTIAL)
         
         assert len(partial_events) > 0
-        assert partial_events[0]['filled_qty'] == 50
-        assert partial_events[0]['remaining_qty'] == 50
+        assert partial_events[0].filled_qty == 50
+        assert partial_events[0].remaining_qty == 50
 
 class TestEdgeCases:
     """Test edge cases in matching"""
     
     def test_zero_quantity_rejected(self, order_book):
         """Test that zero quantity orders are rejected"""
-        from testhelpers import STATUS_INVALID_QUANTITY
-        
-        result = lib.mx_order_book_add_limit(
-            order_book, 1, SIDE_BUY, price_to_ticks(100.00), 0
+        result = _add_limit(
+            order_book, 1, SIDE_BUY, TICKS[100.00], 0
         )
         assert result == STATUS_INVALID_QUANTITY
     
     def test_zero_price_rejected(self, order_book):
         """Test that zero price limit orders are rejected"""
-        from testhelpers import STATUS_INVALID_PRICE
-        
-        result = lib.mx_order_book_add_limit(
+        result = _add_limit(
             order_book, 1, SIDE_BUY, 0, 50
         )
         assert result == STATUS_INVALID_PRICE
@@ -447,12 +424,11 @@ class TestEdgeCases:
         book, trades, events = book_with_callbacks
         
         # Add two buy orders at same price
-        lib.mx_order_book_add_limit(book, 1, SIDE_BUY, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 1, SIDE_BUY, TICKS[100.00], 50)
+        _add_limit(book, 2, SIDE_BUY, TICKS[100.00], 50)
         
         # Should be no trades
         assert trades.count() == 0
         
-        # Both should be in book
-        assert lib.mx_order_book_has_order(book, 1) == 1
-        assert lib.mx_order_book_has_order(book, 2) == 1
+        # Both should be in book, untouched
+        assert get_order_qtys(book, [1, 2]) == [50, 50]
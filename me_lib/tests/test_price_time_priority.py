@@ -6,93 +6,95 @@ Rigorous testing of price-time priority rules and order queue behavior
 import pytest
 from testhelpers import (
     ffi, lib,
+    add_limit_batch, get_order_qty, get_order_qtys, cancel_many,
+    assert_trades_equal, assert_trade_column,
     SIDE_BUY, SIDE_SELL,
     price_to_ticks, ticks_to_price
 )
 
+# Library entry points used below, bound once
+_add_limit = lib.mx_order_book_add_limit
+_cancel = lib.mx_order_book_cancel
+_modify = lib.mx_order_book_modify
+_has_order = lib.mx_order_book_has_order
+
+# Tick values of every price used below, converted once at import
+_P = {p: price_to_ticks(p) for p in (
+    100.00, 100.50, 101.00, 101.50, 102.00, 103.00, 105.00
+)}
+
 class TestStrictTimePriority:
     """Test strict time priority at same price level"""
     
-    def test_fifo_order_at_same_price(self, book_with_callbacks):
-        """Test strict FIFO ordering at same price"""
-        book, trades, events = book_with_callbacks
-        
-        # Add 5 sell orders at exact same price
-        for i in range(1, 6):
-            lib.mx_order_book_add_limit(
-                book, i, SIDE_SELL, price_to_ticks(100.00), 10
-            )
-        
-        trades.clear()
-        
-        # Match with exact quantity to trigger all 5 in sequence
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(100.00), 50)
-        
-        # Should have 5 trades in exact time order
-        assert trades.count() == 5
-        
-        all_trades = trades.get_all()
-        for i, trade in enumerate(all_trades):
-            assert trade['passive_id'] == i + 1  # Order IDs 1, 2, 3, 4, 5
-            assert trade['quantity'] == 10
+    @pytest.mark.parametrize("n_orders,sweeps", [
+        (5, (50,)),
+        (20, (100, 100)),
+        (100, (500, 300, 200)),
+    ], ids=['single_sweep', 'deep_queue', 'deep_queue_uneven_sweeps'])
+    def test_fifo_order_at_same_price(self, native_trade_book, n_orders, sweeps):
+        """Test strict FIFO ordering at same price, across successive sweeps"""
+        book, trades = native_trade_book
+        
+        # n_orders sells of 10 at exactly the same price
+        add_limit_batch(book, [(i, SIDE_SELL, _P[100.00], 10)
+                               for i in range(1, n_orders + 1)])
+        
+        # Each sweep fills the next orders in the queue, in arrival order
+        next_id = 1
+        for buy_id, qty in enumerate(sweeps, start=1000):
+            trades.clear()
+            _add_limit(book, buy_id, SIDE_BUY, _P[100.00], qty)
+            
+            filled = qty // 10
+            assert_trade_column(trades, 'passive_id', range(next_id, next_id + filled))
+            assert_trade_column(trades, 'quantity', [10] * filled)
+            next_id += filled
+        
+        assert _has_order(book, n_orders) == 0
     
     def test_later_orders_wait_their_turn(self, book_with_callbacks):
         """Test that later orders don't jump the queue"""
         book, trades, events = book_with_callbacks
         
         # Add orders at same price with timestamps
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 100)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 100)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(100.00), 100)
+        _add_limit(book, 1, SIDE_SELL, _P[100.00], 100)
+        _add_limit(book, 2, SIDE_SELL, _P[100.00], 100)
+        _add_limit(book, 3, SIDE_SELL, _P[100.00], 100)
         
         trades.clear()
         
         # Match 150 shares - should fill order 1 completely and order 2 partially
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(100.00), 150)
-        
-        # Order 1 should be gone
-        assert lib.mx_order_book_has_order(book, 1) == 0
-        
-        # Order 2 should have 50 remaining
-        qty_out = ffi.new("uint32_t*")
-        lib.mx_order_book_get_order_info(book, 2, ffi.NULL, ffi.NULL, qty_out, ffi.NULL)
-        assert qty_out[0] == 50
+        _add_limit(book, 100, SIDE_BUY, _P[100.00], 150)
         
-        # Order 3 should be untouched
-        lib.mx_order_book_get_order_info(book, 3, ffi.NULL, ffi.NULL, qty_out, ffi.NULL)
-        assert qty_out[0] == 100
+        # Order 1 should be gone, order 2 should have 50 remaining
+        # and order 3 should be untouched
+        assert get_order_qtys(book, [1, 2, 3]) == [0, 50, 100]
         
         trades.clear()
         
         # Match another 100 - should finish order 2, then take 50 from order 3
-        lib.mx_order_book_add_limit(book, 101, SIDE_BUY, price_to_ticks(100.00), 100)
+        _add_limit(book, 101, SIDE_BUY, _P[100.00], 100)
         
-        all_trades = trades.get_all()
-        assert all_trades[0]['passive_id'] == 2
-        assert all_trades[0]['quantity'] == 50
-        assert all_trades[1]['passive_id'] == 3
-        assert all_trades[1]['quantity'] == 50
+        assert_trades_equal(trades, [(2, 50), (3, 50)], fields=('passive_id', 'quantity'))
     
     def test_cancel_does_not_affect_time_priority(self, book_with_callbacks):
         """Test that cancelling one order doesn't affect others' priority"""
         book, trades, events = book_with_callbacks
         
         # Add three orders
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 1, SIDE_SELL, _P[100.00], 50)
+        _add_limit(book, 2, SIDE_SELL, _P[100.00], 50)
+        _add_limit(book, 3, SIDE_SELL, _P[100.00], 50)
         
         # Cancel middle order
-        lib.mx_order_book_cancel(book, 2)
+        _cancel(book, 2)
         
         trades.clear()
         
         # Match - should go to order 1 first, then order 3
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(100.00), 100)
+        _add_limit(book, 100, SIDE_BUY, _P[100.00], 100)
         
-        all_trades = trades.get_all()
-        assert all_trades[0]['passive_id'] == 1
-        assert all_trades[1]['passive_id'] == 3  # Not order 2!
+        assert_trade_column(trades, 'passive_id', (1, 3))  # Not order 2!
 
 class TestStrictPricePriority:
     """Test strict price priority"""
@@ -102,61 +104,55 @@ class TestStrictPricePriority:
         book, trades, events = book_with_callbacks
         
         # Add sells at different prices (add in random order)
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(102.00), 50)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 50)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(101.00), 50)
+        _add_limit(book, 1, SIDE_SELL, _P[102.00], 50)
+        _add_limit(book, 2, SIDE_SELL, _P[100.00], 50)
+        _add_limit(book, 3, SIDE_SELL, _P[101.00], 50)
         
         trades.clear()
         
         # Buy at 102 - should match order 2 first (lowest price)
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(102.00), 50)
+        _add_limit(book, 100, SIDE_BUY, _P[102.00], 50)
         
         assert trades.count() == 1
-        assert trades.get_last()['passive_id'] == 2
-        assert trades.get_last()['price'] == price_to_ticks(100.00)
+        assert trades.get_last().passive_id == 2
+        assert trades.get_last().price == _P[100.00]
     
     def test_price_priority_overrides_time(self, book_with_callbacks):
         """Test that better price beats earlier time"""
         book, trades, events = book_with_callbacks
         
         # Add older order at worse price
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(101.00), 50)
+        _add_limit(book, 1, SIDE_SELL, _P[101.00], 50)
         
         # Add newer order at better price
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 2, SIDE_SELL, _P[100.00], 50)
         
         trades.clear()
         
         # Should match order 2 despite being added later
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(101.00), 50)
+        _add_limit(book, 100, SIDE_BUY, _P[101.00], 50)
         
-        assert trades.get_last()['passive_id'] == 2
+        assert trades.get_last().passive_id == 2
     
     def test_walk_through_price_levels_in_order(self, book_with_callbacks):
         """Test that matching walks through price levels correctly"""
         book, trades, events = book_with_callbacks
         
         # Build a deep order book
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 20)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.50), 20)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(101.00), 20)
-        lib.mx_order_book_add_limit(book, 4, SIDE_SELL, price_to_ticks(101.50), 20)
-        lib.mx_order_book_add_limit(book, 5, SIDE_SELL, price_to_ticks(102.00), 20)
+        _add_limit(book, 1, SIDE_SELL, _P[100.00], 20)
+        _add_limit(book, 2, SIDE_SELL, _P[100.50], 20)
+        _add_limit(book, 3, SIDE_SELL, _P[101.00], 20)
+        _add_limit(book, 4, SIDE_SELL, _P[101.50], 20)
+        _add_limit(book, 5, SIDE_SELL, _P[102.00], 20)
         
         trades.clear()
         
         # Large buy walks through all levels
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(103.00), 100)
+        _add_limit(book, 100, SIDE_BUY, _P[103.00], 100)
         
         # Should match in exact price order
-        assert trades.count() == 5
-        all_trades = trades.get_all()
-        
-        assert all_trades[0]['price'] == price_to_ticks(100.00)
-        assert all_trades[1]['price'] == price_to_ticks(100.50)
-        assert all_trades[2]['price'] == price_to_ticks(101.00)
-        assert all_trades[3]['price'] == price_to_ticks(101.50)
-        assert all_trades[4]['price'] == price_to_ticks(102.00)
+        assert_trade_column(trades, 'price',
+                            [_P[p] for p in (100.00, 100.50, 101.00, 101.50, 102.00)])
 
 class TestPriceTimeCombinations:
     """Test complex price-time priority scenarios"""
@@ -166,54 +162,48 @@ class TestPriceTimeCombinations:
         book, trades, events = book_with_callbacks
         
         # Price level $100: orders 1, 2, 3
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 30)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 30)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(100.00), 30)
+        _add_limit(book, 1, SIDE_SELL, _P[100.00], 30)
+        _add_limit(book, 2, SIDE_SELL, _P[100.00], 30)
+        _add_limit(book, 3, SIDE_SELL, _P[100.00], 30)
         
         # Price level $101: orders 4, 5
-        lib.mx_order_book_add_limit(book, 4, SIDE_SELL, price_to_ticks(101.00), 30)
-        lib.mx_order_book_add_limit(book, 5, SIDE_SELL, price_to_ticks(101.00), 30)
+        _add_limit(book, 4, SIDE_SELL, _P[101.00], 30)
+        _add_limit(book, 5, SIDE_SELL, _P[101.00], 30)
         
         trades.clear()
         
         # Match 100 shares - should take all of $100 level, then 10 from $101
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(101.00), 100)
-        
-        all_trades = trades.get_all()
-        
-        # First 3 trades at $100 in time order
-        assert all_trades[0]['passive_id'] == 1
-        assert all_trades[1]['passive_id'] == 2
-        assert all_trades[2]['passive_id'] == 3
-        assert all_trades[0]['price'] == price_to_ticks(100.00)
-        
-        # 4th trade at $101 with order 4
-        assert all_trades[3]['passive_id'] == 4
-        assert all_trades[3]['price'] == price_to_ticks(101.00)
+        _add_limit(book, 100, SIDE_BUY, _P[101.00], 100)
+        
+        # First 3 trades at $100 in time order, then 10 from order 4 at $101
+        assert_trades_equal(trades, [
+            (1, _P[100.00], 30),
+            (2, _P[100.00], 30),
+            (3, _P[100.00], 30),
+            (4, _P[101.00], 10),
+        ], fields=('passive_id', 'price', 'quantity'))
     
     def test_interleaved_price_levels(self, book_with_callbacks):
         """Test that orders maintain priority when prices are added in mixed order"""
         book, trades, events = book_with_callbacks
         
         # Add in mixed order: $101, $100, $101, $100
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(101.00), 25)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 25)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(101.00), 25)
-        lib.mx_order_book_add_limit(book, 4, SIDE_SELL, price_to_ticks(100.00), 25)
+        _add_limit(book, 1, SIDE_SELL, _P[101.00], 25)
+        _add_limit(book, 2, SIDE_SELL, _P[100.00], 25)
+        _add_limit(book, 3, SIDE_SELL, _P[101.00], 25)
+        _add_limit(book, 4, SIDE_SELL, _P[100.00], 25)
         
         trades.clear()
         
         # Match 75 shares
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(101.00), 75)
+        _add_limit(book, 100, SIDE_BUY, _P[101.00], 75)
         
         # Should match: all of $100 level (order 2, then 4), then part of $101
-        all_trades = trades.get_all()
-        
-        assert all_trades[0]['passive_id'] == 2  # First $100 order
-        assert all_trades[1]['passive_id'] == 4  # Second $100 order
-        assert all_trades[2]['passive_id'] == 1  # First $101 order
-        
-        assert all_trades[2]['quantity'] == 25  # Remaining quantity
+        assert_trades_equal(trades, [
+            (2, 25),  # First $100 order
+            (4, 25),  # Second $100 order
+            (1, 25),  # First $101 order, remaining quantity
+        ], fields=('passive_id', 'quantity'))
 
 class TestPartialFillPriority:
     """Test that partial fills maintain time priority"""
@@ -223,63 +213,57 @@ class TestPartialFillPriority:
         book, trades, events = book_with_callbacks
         
         # Add three orders at same price
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 100)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 100)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(100.00), 100)
+        _add_limit(book, 1, SIDE_SELL, _P[100.00], 100)
+        _add_limit(book, 2, SIDE_SELL, _P[100.00], 100)
+        _add_limit(book, 3, SIDE_SELL, _P[100.00], 100)
         
         trades.clear()
         
         # Partially fill order 1
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 100, SIDE_BUY, _P[100.00], 50)
         
         assert trades.count() == 1
-        assert trades.get_last()['passive_id'] == 1
+        assert trades.get_last().passive_id == 1
         
         trades.clear()
         
         # Next match should still be order 1 (remaining 50)
-        lib.mx_order_book_add_limit(book, 101, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 101, SIDE_BUY, _P[100.00], 50)
         
         assert trades.count() == 1
-        assert trades.get_last()['passive_id'] == 1
+        assert trades.get_last().passive_id == 1
         
-        # Order 1 should now be gone
-        assert lib.mx_order_book_has_order(book, 1) == 0
+        # Order 1 should now be gone, orders 2 and 3 untouched
+        assert get_order_qtys(book, [1, 2, 3]) == [0, 100, 100]
         
         trades.clear()
         
         # Next match should be order 2
-        lib.mx_order_book_add_limit(book, 102, SIDE_BUY, price_to_ticks(100.00), 25)
+        _add_limit(book, 102, SIDE_BUY, _P[100.00], 25)
         
-        assert trades.get_last()['passive_id'] == 2
+        assert trades.get_last().passive_id == 2
     
     def test_multiple_partial_fills_maintain_priority(self, book_with_callbacks):
         """Test order getting chipped away maintains priority"""
         book, trades, events = book_with_callbacks
         
         # Add orders
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 200)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 100)
+        _add_limit(book, 1, SIDE_SELL, _P[100.00], 200)
+        _add_limit(book, 2, SIDE_SELL, _P[100.00], 100)
         
         trades.clear()
         
         # Chip away at order 1 in small pieces
-        for i in range(4):
-            lib.mx_order_book_add_limit(book, 100 + i, SIDE_BUY, price_to_ticks(100.00), 40)
+        add_limit_batch(book, [(100 + i, SIDE_BUY, _P[100.00], 40) for i in range(4)])
         
         # All 4 trades should be with order 1
-        all_trades = trades.get_all()
-        for trade in all_trades:
-            assert trade['passive_id'] == 1
+        assert_trades_equal(trades, [(1, 40)] * 4, fields=('passive_id', 'quantity'))
         
         # Order 1 should have 40 remaining (200 - 160)
-        qty_out = ffi.new("uint32_t*")
-        lib.mx_order_book_get_order_info(book, 1, ffi.NULL, ffi.NULL, qty_out, ffi.NULL)
-        assert qty_out[0] == 40
+        assert get_order_qty(book, 1) == 40
         
         # Order 2 should be untouched
-        lib.mx_order_book_get_order_info(book, 2, ffi.NULL, ffi.NULL, qty_out, ffi.NULL)
-        assert qty_out[0] == 100
+        assert get_order_qty(book, 2) == 100
 
 class TestModifyPreservesPriority:
     """Test that quantity reductions preserve time priority"""
@@ -289,52 +273,46 @@ class TestModifyPreservesPriority:
         book, trades, events = book_with_callbacks
         
         # Add three orders
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 100)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 100)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(100.00), 100)
+        _add_limit(book, 1, SIDE_SELL, _P[100.00], 100)
+        _add_limit(book, 2, SIDE_SELL, _P[100.00], 100)
+        _add_limit(book, 3, SIDE_SELL, _P[100.00], 100)
         
         # Reduce first order's quantity
-        result = lib.mx_order_book_modify(book, 1, 50)
+        result = _modify(book, 1, 50)
         assert result == 0  # Success
         
         trades.clear()
         
         # Match - should still match order 1 first
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(100.00), 50)
+        _add_limit(book, 100, SIDE_BUY, _P[100.00], 50)
         
         assert trades.count() == 1
-        assert trades.get_last()['passive_id'] == 1
+        assert trades.get_last().passive_id == 1
         
-        # Order 1 should be completely filled now
-        assert lib.mx_order_book_has_order(book, 1) == 0
+        # Order 1 should be completely filled now, the others untouched
+        assert get_order_qtys(book, [1, 2, 3]) == [0, 100, 100]
     
     def test_modify_between_other_orders(self, book_with_callbacks):
         """Test modifying an order between other orders at same price"""
         book, trades, events = book_with_callbacks
         
         # Add orders: 100, 200, 100 shares
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 100)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 200)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(100.00), 100)
+        _add_limit(book, 1, SIDE_SELL, _P[100.00], 100)
+        _add_limit(book, 2, SIDE_SELL, _P[100.00], 200)
+        _add_limit(book, 3, SIDE_SELL, _P[100.00], 100)
         
         # Reduce middle order
-        lib.mx_order_book_modify(book, 2, 50)
+        _modify(book, 2, 50)
         
         trades.clear()
         
         # Match 150 shares - should be order 1 (100), then order 2 (50)
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(100.00), 150)
+        _add_limit(book, 100, SIDE_BUY, _P[100.00], 150)
         
-        all_trades = trades.get_all()
-        assert all_trades[0]['passive_id'] == 1
-        assert all_trades[0]['quantity'] == 100
-        assert all_trades[1]['passive_id'] == 2
-        assert all_trades[1]['quantity'] == 50
+        assert_trades_equal(trades, [(1, 100), (2, 50)], fields=('passive_id', 'quantity'))
         
         # Order 3 should still have 100
-        qty_out = ffi.new("uint32_t*")
-        lib.mx_order_book_get_order_info(book, 3, ffi.NULL, ffi.NULL, qty_out, ffi.NULL)
-        assert qty_out[0] == 100
+        assert get_order_qty(book, 3) == 100
 
 class TestAggressiveOrderPriority:
     """Test priority rules for aggressive orders"""
@@ -344,35 +322,32 @@ class TestAggressiveOrderPriority:
         book, trades, events = book_with_callbacks
         
         # Passive sell at $100
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 1, SIDE_SELL, _P[100.00], 50)
         
         trades.clear()
         
         # Aggressive buy at $105 - should execute at $100 (seller's price)
-        lib.mx_order_book_add_limit(book, 2, SIDE_BUY, price_to_ticks(105.00), 50)
+        _add_limit(book, 2, SIDE_BUY, _P[105.00], 50)
         
         assert trades.count() == 1
-        assert trades.get_last()['price'] == price_to_ticks(100.00)  # Passive price
+        assert trades.get_last().price == _P[100.00]  # Passive price
     
     def test_aggressive_gets_price_improvement(self, book_with_callbacks):
         """Test that aggressive order benefits from better passive prices"""
         book, trades, events = book_with_callbacks
         
         # Multiple passive sells
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 30)
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.50), 30)
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(101.00), 30)
+        _add_limit(book, 1, SIDE_SELL, _P[100.00], 30)
+        _add_limit(book, 2, SIDE_SELL, _P[100.50], 30)
+        _add_limit(book, 3, SIDE_SELL, _P[101.00], 30)
         
         trades.clear()
         
         # Aggressive buy willing to pay $102
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(102.00), 90)
+        _add_limit(book, 100, SIDE_BUY, _P[102.00], 90)
         
         # Should get price improvement at all levels
-        all_trades = trades.get_all()
-        assert all_trades[0]['price'] == price_to_ticks(100.00)
-        assert all_trades[1]['price'] == price_to_ticks(100.50)
-        assert all_trades[2]['price'] == price_to_ticks(101.00)
+        assert_trade_column(trades, 'price', [_P[100.00], _P[100.50], _P[101.00]])
         
         # Never paid $102 even though willing to
 
@@ -384,82 +359,45 @@ class TestComplexScenarios:
         book, trades, events = book_with_callbacks
         
         # Add order 1
-        lib.mx_order_book_add_limit(book, 1, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 1, SIDE_SELL, _P[100.00], 50)
         
         # Partially match it
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(100.00), 20)
+        _add_limit(book, 100, SIDE_BUY, _P[100.00], 20)
         
         # Add order 2
-        lib.mx_order_book_add_limit(book, 2, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 2, SIDE_SELL, _P[100.00], 50)
         
         # Add order 3
-        lib.mx_order_book_add_limit(book, 3, SIDE_SELL, price_to_ticks(100.00), 50)
+        _add_limit(book, 3, SIDE_SELL, _P[100.00], 50)
         
         trades.clear()
         
         # Match - should get order 1's remaining 30 first
-        lib.mx_order_book_add_limit(book, 101, SIDE_BUY, price_to_ticks(100.00), 100)
-        
-        all_trades = trades.get_all()
-        assert all_trades[0]['passive_id'] == 1
-        assert all_trades[0]['quantity'] == 30  # Remaining from order 1
-        assert all_trades[1]['passive_id'] == 2
-        assert all_trades[2]['passive_id'] == 3
-    
-    def test_deep_queue_integrity(self, book_with_callbacks):
-        """Test priority with deep order queue"""
-        book, trades, events = book_with_callbacks
-        
-        # Add 20 orders at same price
-        for i in range(1, 21):
-            lib.mx_order_book_add_limit(
-                book, i, SIDE_SELL, price_to_ticks(100.00), 10
-            )
-        
-        trades.clear()
-        
-        # Match them in batches
-        lib.mx_order_book_add_limit(book, 100, SIDE_BUY, price_to_ticks(100.00), 100)
+        _add_limit(book, 101, SIDE_BUY, _P[100.00], 100)
         
-        # Should match first 10 orders in exact sequence
-        all_trades = trades.get_all()
-        for i, trade in enumerate(all_trades):
-            assert trade['passive_id'] == i + 1
-        
-        trades.clear()
-        
-        # Match next batch
-        lib.mx_order_book_add_limit(book, 101, SIDE_BUY, price_to_ticks(100.00), 100)
-        
-        # Should match orders 11-20
-        all_trades = trades.get_all()
-        for i, trade in enumerate(all_trades):
-            assert trade['passive_id'] == i + 11
+        assert_trades_equal(trades, [
+            (1, 30),  # Remaining from order 1
+            (2, 50),
+            (3, 20),
+        ], fields=('passive_id', 'quantity'))
     
     @pytest.mark.slow
-    def test_stress_priority_with_many_operations(self, book_with_callbacks):
+    def test_stress_priority_with_many_operations(self, native_trade_book):
         """Stress test with many adds, matches, and cancels"""
-        book, trades, events = book_with_callbacks
+        book, trades = native_trade_book
         
         # Add 100 orders
-        for i in range(1, 101):
-            lib.mx_order_book_add_limit(
-                book, i, SIDE_SELL, price_to_ticks(100.00), 5
-            )
+        add_limit_batch(book, [(i, SIDE_SELL, _P[100.00], 5) for i in range(1, 101)])
         
         # Cancel every 3rd order
-        for i in range(3, 101, 3):
-            lib.mx_order_book_cancel(book, i)
+        assert cancel_many(book, list(range(3, 101, 3))) == 33
         
         trades.clear()
         
         # Match 100 shares
-        lib.mx_order_book_add_limit(book, 1000, SIDE_BUY, price_to_ticks(100.00), 100)
+        _add_limit(book, 1000, SIDE_BUY, _P[100.00], 100)
         
         # Verify all trades are in correct order (skipping cancelled ones)
-        all_trades = trades.get_all()
-        prev_id = 0
-        for trade in all_trades:
-            assert trade['passive_id'] > prev_id
-            assert trade['passive_id'] % 3 != 0  # None of the cancelled orders
-            prev_id = trade['passive_id']
+        # 20 fills of 5, in queue order, none of them cancelled orders
+        remaining = [i for i in range(1, 101) if i % 3 != 0]
+        assert_trade_column(trades, 'passive_id', remaining[:20])
@@ -2,240 +2,132 @@
 Test helpers - CFFI setup for loading the MatchX library
 Following the article's pattern for beautiful native library testing
 """
+import logging
 import os
 import sys
-import re
+import tempfile
+from array import array
+from collections import namedtuple
+from itertools import islice
 from cffi import FFI
+from cffi_header import parse_header_for_cffi, read_cdef
+from build_cffi import get_library_path, is_current
 
-# Determine the library path based on platform
-def get_library_path():
-    """Get the path to the compiled library"""
-    here = os.path.abspath(os.path.dirname(__file__))
-    project_root = os.path.dirname(here)
-    
-    if sys.platform == 'darwin':
-        lib_name = 'libMatchEngine.dylib'
-    elif sys.platform == 'win32':
-        lib_name = 'MatchEngine.dll'
-    else:
-        lib_name = 'libMatchEngine.so'
-    
-    possible_paths = [
-        os.path.join(project_root, 'build', 'bin', 'release', lib_name),
-        os.path.join(project_root, 'build', 'bin', 'debug', lib_name),
-        os.path.join(project_root, 'build', 'bin', 'Release', lib_name),
-        os.path.join(project_root, 'build', 'bin', 'Debug', lib_name),
-        os.path.join(project_root, 'bin', 'release', lib_name),
-        os.path.join(project_root, 'bin', 'debug', lib_name),
-        os.path.join(project_root, 'bin', 'Release', lib_name),
-        os.path.join(project_root, 'bin', 'Debug', lib_name),
-    ]
-    
-    for path in possible_paths:
-        if os.path.exists(path):
-            return path
-    
-    raise RuntimeError(
-        f"Could not find library {lib_name} in any of:\n" + 
-        "\n".join(f"  - {p}" for p in possible_paths) +
-        "\n\nPlease build the library first: ./build.sh --build"
-    )
+# Import-time diagnostics; enable with --log-level=DEBUG
+log = logging.getLogger("matchx.test")
 
-def parse_header_for_cffi(header_path):
+def get_cdef_source(header_path):
     """
-    Parse the header file and prepare it for CFFI.
-    Handles multi-line declarations properly.
+    Return the CFFI declarations for the header, reusing the last parse.
+    Reads the checked-in matchengine.cdef when it was generated from this
+    exact header. Otherwise (the header was edited without regenerating
+    it) the parse is cached in __pycache__ keyed by the header's mtime and
+    size, so each pytest worker skips the parse while the header is
+    unchanged.
     """
-    with open(header_path, 'r') as f:
-        content = f.read()
-    
-    # Remove C++ blocks
-    content = re.sub(r'#ifdef __cplusplus.*?#endif', '', content, flags=re.DOTALL)
+    here = os.path.dirname(os.path.abspath(__file__))
+    shipped = read_cdef(header_path, os.path.join(here, 'matchengine.cdef'))
+    if shipped is not None:
+        return shipped
     
-    # Remove comments
-    content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-    content = re.sub(r'//.*$', '', content, flags=re.MULTILINE)
+    st = os.stat(header_path)
+    cache_dir = os.path.join(here, '__pycache__')
+    cache_name = f'matchengine_cdef_{st.st_mtime_ns}_{st.st_size}.txt'
+    cache_path = os.path.join(cache_dir, cache_name)
     
-    # Remove preprocessor directives
-    content = re.sub(r'#.*$', '', content, flags=re.MULTILINE)
-    
-    # Remove MX_API macro
-    content = content.replace('MX_API', '')
-    
-    # DON'T replace stdint types - CFFI understands them natively!
-    # Just make sure we include the standard definitions
-    
-    # Extract complete declarations (handle multi-line)
-    declarations = []
-    current_decl = []
-    brace_depth = 0
-    paren_depth = 0
-    
-    for line in content.split('\n'):
-        line = line.strip()
-        if not line:
-            continue
-        
-        current_decl.append(line)
-        
-        # Track braces and parentheses
-        brace_depth += line.count('{') - line.count('}')
-        paren_depth += line.count('(') - line.count(')')
-        
-        # A declaration is complete when we hit a semicolon at depth 0
-        if ';' in line and brace_depth == 0 and paren_depth == 0:
-            full_decl = ' '.join(current_decl)
-            # Clean up extra spaces
-            full_decl = re.sub(r'\s+', ' ', full_decl)
-            declarations.append(full_decl)
-            current_decl = []
-    
-    # Primitive C types that should NOT be treated as opaque types
-    primitive_types = {
-        'void', 'char', 'short', 'int', 'long', 'float', 'double',
-        'signed', 'unsigned', 'const', 'struct', 'enum', 'union',
-        'size_t', 'ssize_t', 'ptrdiff_t', 'wchar_t',
-        'uint8_t', 'uint16_t', 'uint32_t', 'uint64_t',
-        'int8_t', 'int16_t', 'int32_t', 'int64_t'
-    }
+    try:
+        with open(cache_path, 'r') as f:
+            return f.read()
+    except OSError:
+        pass
     
-    # Now organize declarations
-    opaque_types = set()
-    enums = []
-    structs = []
-    typedefs = []
-    functions = []
+    content = parse_header_for_cffi(header_path)
     
-    for decl in declarations:
-        # Skip empty declarations
-        if not decl.strip():
-            continue
+    # Write under a unique name then rename, so concurrent workers never
+    # read a half-written cache file
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f'{cache_path}.{os.getpid()}'
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, cache_path)
         
-        # Categorize
-        if 'typedef enum' in decl:
-            enums.append(decl)
-            # Extract the typedef name
-            match = re.search(r'typedef\s+enum.*?}\s*(\w+);', decl)
-            if match:
-                type_name = match.group(1)
-                if type_name not in primitive_types:
-                    opaque_types.add(type_name)
-        elif 'typedef struct' in decl and '{' not in decl:
-            # Opaque struct typedef like: typedef struct xyz xyz_t;
-            match = re.match(r'typedef\s+struct\s+\w+\s+(\w+);', decl)
-            if match:
-                type_name = match.group(1)
-                if type_name not in primitive_types:
-                    opaque_types.add(type_name)
-        elif 'typedef struct' in decl:
-            structs.append(decl)
-        elif 'typedef' in decl:
-            typedefs.append(decl)
-        elif '(' in decl and not decl.startswith('typedef'):
-            functions.append(decl)
-            # Find pointer types in function signatures
-            # Match word followed by * but not preceded by )
-            matches = re.findall(r'(?<![)])\b(\w+)\s*\*', decl)
-            for match in matches:
-                if match not in primitive_types and match not in ['char', 'void']:
-                    opaque_types.add(match)
-    
-    # Remove any enum/struct types that are actually defined (not opaque)
-    defined_types = set()
-    for enum in enums:
-        match = re.search(r'typedef\s+enum.*?}\s*(\w+);', enum)
-        if match:
-            defined_types.add(match.group(1))
-    for struct in structs:
-        match = re.search(r'typedef\s+struct.*?}\s*(\w+);', struct)
-        if match:
-            defined_types.add(match.group(1))
-    
-    # Only keep truly opaque types (not defined in this header)
-    opaque_types = opaque_types - defined_types
-    
-    # Build final CFFI-compatible header
-    result = []
-    
-    # Add stdint types that CFFI needs
-    result.append("typedef unsigned char uint8_t;")
-    result.append("typedef unsigned short uint16_t;")
-    result.append("typedef unsigned int uint32_t;")
-    result.append("typedef unsigned long long uint64_t;")
-    result.append("typedef signed char int8_t;")
-    result.append("typedef short int16_t;")
-    result.append("typedef int int32_t;")
-    result.append("typedef long long int64_t;")
-    result.append("typedef unsigned long size_t;")
-    result.append("")
-    
-    # Declare opaque types first
-    for otype in sorted(opaque_types):
-        result.append(f"typedef struct {otype} {otype};")
+        # Drop the parses of earlier versions of the header
+        for entry in os.scandir(cache_dir):
+            if (entry.name.startswith('matchengine_cdef_') and entry.name.endswith('.txt')
+                    and entry.name != cache_name):
+                os.remove(entry.path)
+    except OSError:
+        pass
     
-    if opaque_types:
-        result.append("")
-    
-    # Add enums
-    for enum in enums:
-        result.append(enum)
-    if enums:
-        result.append("")
-    
-    # Add structs
-    for struct in structs:
-        result.append(struct)
-    if structs:
-        result.append("")
+    return content
+
+def import_api_module(header_path):
+    """
+    Import the API-mode module built by build_cffi.py, or return None
+    A module that is not current (older than the header or the cdef, or
+    linked against another library than get_library_path() finds) is
+    ignored. Set MATCHX_CFFI_ABI=1 to always use ABI mode.
+    """
+    if os.environ.get('MATCHX_CFFI_ABI'):
+        return None
     
-    # Add typedefs
-    for typedef in typedefs:
-        result.append(typedef)
-    if typedefs:
-        result.append("")
+    try:
+        if not is_current(get_library_path()):
+            return None
+    except RuntimeError:
+        return None
     
-    # Add functions
-    for func in functions:
-        result.append(func)
+    build_dir = os.path.join(os.path.dirname(os.path.dirname(header_path)), 'build', 'cffi')
+    sys.path.insert(0, build_dir)
+    try:
+        import _matchengine_cffi as module
+    except ImportError:
+        return None
+    finally:
+        sys.path.remove(build_dir)
     
-    return '\n'.join(result)
-
-# Initialize CFFI
-ffi = FFI()
+    return module
 
 # Get header path
 here = os.path.abspath(os.path.dirname(__file__))
 project_root = os.path.dirname(here)
 header_path = os.path.join(project_root, 'include', 'matchengine.h')
 
-# Parse the header
-try:
-    header_content = parse_header_for_cffi(header_path)
-    ffi.cdef(header_content)
-except Exception as e:
-    print("=" * 70)
-    print("ERROR: Failed to parse header for CFFI")
-    print("=" * 70)
-    print(f"Error: {e}")
-    print("\nHeader content that was prepared for CFFI:")
-    print("-" * 70)
-    for i, line in enumerate(header_content.split('\n'), 1):
-        print(f"{i:3}: {line}")
-    print("-" * 70)
-    raise
-
-# Load the library
-lib_path = get_library_path()
-lib = ffi.dlopen(lib_path)
-
-print(f"✓ Loaded MatchX library from: {lib_path}")
-
-# Try to get version
-try:
-    version = lib.mx_get_version()
-    print(f"✓ Library version: {version}")
-except Exception as e:
-    print(f"✓ Library loaded (version: unknown)")
+# Prefer the compiled API-mode bindings; otherwise parse the header and
+# dlopen the library (ABI mode)
+_api_module = import_api_module(header_path)
+
+if _api_module is not None:
+    ffi, lib = _api_module.ffi, _api_module.lib
+    lib_path = _api_module.__file__
+else:
+    ffi = FFI()
+    
+    # Parse the header
+    header_content = get_cdef_source(header_path)
+    try:
+        ffi.cdef(header_content)
+    except Exception as e:
+        # Save the full declarations for inspection and quote only the
+        # start, so a large header cannot flood the error
+        with tempfile.NamedTemporaryFile('w', suffix='.cdef', delete=False) as f:
+            f.write(header_content)
+        numbered = '\n'.join(f"{i:3}: {line}" for i, line in
+                             enumerate(islice(header_content.split('\n'), 20), 1))
+        raise RuntimeError(
+            f"Failed to parse header for CFFI: {e}\n"
+            f"Header content that was prepared for CFFI is in {f.name}; "
+            f"first 20 lines:\n{numbered}"
+        ) from e
+    
+    # Load the library
+    lib_path = get_library_path()
+    # Bind every symbol up front (cffi's default, spelled out)
+    lib = ffi.dlopen(lib_path, ffi.RTLD_NOW)
+
+log.debug("Loaded MatchX library from %s (%s mode)", lib_path,
+          "API" if _api_module is not None else "ABI")
 
 # Helper functions for testing
 def create_context():
@@ -247,53 +139,218 @@ def free_context(ctx):
     if ctx and ctx != ffi.NULL:
         lib.mx_context_free(ctx)
 
+# Symbols used by the tests, allocated once as C strings
+SYM_TEST = ffi.new("char[]", b"TEST")
+SYM_BTC = ffi.new("char[]", b"BTCUSD")
+SYM_AAPL = ffi.new("char[]", b"AAPL")
+
+# Bound once so hot call sites read a global instead of ffi.NULL
+NULL = ffi.NULL
+
+# Array types the batch helpers allocate, resolved once
+LIMIT_ORDER_ARRAY_T = ffi.typeof("mx_limit_order_t[]")
+OP_ARRAY_T = ffi.typeof("mx_op_t[]")
+U64_ARRAY_T = ffi.typeof("uint64_t[]")
+U32_ARRAY_T = ffi.typeof("uint32_t[]")
+
+# For arrays built from a list, which sets every element: skips the
+# zeroing pass ffi.new makes first
+_new_filled = ffi.new_allocator(should_clear_after_alloc=False)
+
+# char[] buffers of the str/bytes symbols passed to create_order_book
+_symbol_buffers = {}
+
 def create_order_book(ctx, symbol):
-    """Create a new order book"""
-    symbol_bytes = symbol.encode('utf-8') if isinstance(symbol, str) else symbol
-    return lib.mx_order_book_new(ctx, symbol_bytes)
+    """Create a new order book (symbol: str, bytes or a prebuilt SYM_* buffer)"""
+    if not isinstance(symbol, ffi.CData):
+        buf = _symbol_buffers.get(symbol)
+        if buf is None:
+            symbol_bytes = symbol.encode('utf-8') if isinstance(symbol, str) else symbol
+            buf = _symbol_buffers[symbol] = ffi.new("char[]", symbol_bytes)
+        symbol = buf
+    return lib.mx_order_book_new(ctx, symbol)
 
 def free_order_book(book):
     """Free an order book"""
     if book and book != ffi.NULL:
         lib.mx_order_book_free(book)
 
+def limit_batch(orders):
+    """Build an mx_limit_order_t[] from (order_id, side, price, quantity) tuples"""
+    return ffi.new(LIMIT_ORDER_ARRAY_T, orders)
+
+def add_limit_batch(book, orders, results=ffi.NULL):
+    """
+    Add many limit orders with one FFI call
+    orders is a list of tuples or an array from limit_batch()
+    Returns the number of orders accepted
+    """
+    if not isinstance(orders, ffi.CData):
+        orders = limit_batch(orders)
+    return lib.mx_order_book_add_limit_batch(book, orders, len(orders), results)
+
+def op_tape(ops):
+    """Build an mx_op_t[] from (order_id, op, side, price, quantity) tuples"""
+    return ffi.new(OP_ARRAY_T, ops)
+
+def replay(book, ops, results=ffi.NULL):
+    """
+    Replay adds and cancels with one FFI call
+    ops is a list of tuples or an array from op_tape()
+    Returns the number of operations that succeeded
+    """
+    if not isinstance(ops, ffi.CData):
+        ops = op_tape(ops)
+    return lib.mx_order_book_replay(book, ops, len(ops), results)
+
+# Rows handed out by the trade and order event recorders
+Trade = namedtuple('Trade', ['aggressive_id', 'passive_id', 'price', 'quantity', 'timestamp'])
+OrderEvent = namedtuple('OrderEvent', ['order_id', 'event', 'filled_qty', 'remaining_qty'])
+
+def assert_trades_equal(trades, expected, fields=('price', 'quantity')):
+    """
+    Compare recorded trades with expected rows, one column at a time
+    Each expected row is a tuple ordered like fields
+    """
+    view = trades.view()
+    n = len(view.quantity)
+    assert n == len(expected), f"expected {len(expected)} trades, got {n}"
+    
+    # Transpose the rows once rather than walking them per field
+    for field, values in zip(fields, zip(*expected)):
+        _assert_column(field, getattr(view, field), values)
+
+def assert_trade_column(trades, field, values):
+    """
+    Compare one recorded trade column with expected values in one bulk
+    compare; values can be any iterable of ints, e.g. a range
+    """
+    _assert_column(field, getattr(trades.view(), field), values)
+
+def _assert_column(field, got, values):
+    typecode = got.format if isinstance(got, memoryview) else got.typecode
+    want = array(typecode, values)
+    if got == want:
+        return
+    
+    # Only walk the columns once the bulk compare has failed
+    first = next((i for i, (g, w) in enumerate(zip(got, want)) if g != w),
+                 min(len(got), len(want)))
+    raise AssertionError(
+        f"{field}: first mismatch at trade {first}; "
+        f"got {got.tolist()}, expected {want.tolist()}"
+    )
+
+def add_limit_same_level(book, side, price, order_ids, quantities, results=ffi.NULL):
+    """
+    Add limit orders that share a side and price with one FFI call
+    Returns the number of orders accepted
+    """
+    ids = _new_filled(U64_ARRAY_T, order_ids)
+    qtys = _new_filled(U32_ARRAY_T, quantities)
+    return lib.mx_order_book_add_limit_same_level(book, side, price, ids, qtys,
+                                                  len(order_ids), results)
+
+def cancel_many(book, order_ids, results=ffi.NULL):
+    """
+    Cancel several orders with one FFI call
+    Returns the number of orders cancelled
+    """
+    ids = _new_filled(U64_ARRAY_T, order_ids)
+    return lib.mx_order_book_cancel_many(book, ids, len(order_ids), results)
+
+def get_order_qtys(book, order_ids):
+    """Remaining quantities of several orders with one FFI call (0 if gone)"""
+    ids = _new_filled(U64_ARRAY_T, order_ids)
+    quantities = ffi.new(U32_ARRAY_T, len(order_ids))
+    lib.mx_order_book_get_quantities(book, ids, len(order_ids), quantities)
+    return list(quantities)
+
+# Scratch out-parameter shared by get_order_qty
+_qty_out = ffi.new("uint32_t*")
+
+def get_order_qty(book, order_id):
+    """Remaining quantity of a resting order, or None if it is not in the book"""
+    if lib.mx_order_book_get_order_info(book, order_id, ffi.NULL, ffi.NULL,
+                                        _qty_out, ffi.NULL) != STATUS_OK:
+        return None
+    return _qty_out[0]
+
+# Scratch out-parameter shared by get_total_orders
+_total_out = ffi.new("uint32_t*")
+
+def get_total_orders(book):
+    """Number of resting orders in the book"""
+    lib.mx_order_book_get_stats(book, _total_out, NULL, NULL, NULL, NULL)
+    return _total_out[0]
+
 # Price conversion helpers
 def price_to_ticks(price_float):
-    """Convert float price to integer ticks (e.g., $100.50 -> 10050)"""
-    return int(price_float * 100)
+    """
+    Convert float price to integer ticks (e.g., $100.50 -> 10050)
+    Rounds to the nearest tick: 1.15 * 100 is 114.999..., which int()
+    would truncate a tick short
+    """
+    return round(price_float * 100)
 
 def ticks_to_price(ticks):
     """Convert integer ticks to float price (e.g., 10050 -> $100.50)"""
     return ticks / 100.0
 
-# Callback storage
+def price_ladder(base, step, count):
+    """
+    Precompute ticks for base, base + step, ... (count prices)
+    Returns an array('I') so hot loops index instead of converting
+    """
+    return array('I', [price_to_ticks(base + i * step) for i in range(count)])
+
+# Callback storage, keyed by _callback_key; each entry keeps the objects
+# behind its key alive, so their ids are never reused while cached
 _callback_storage = {}
 
+def _callback_key(ctype, func):
+    """
+    Stable cache key for func: a bound method such as recorder.record is
+    a new object on every attribute access, so it is keyed by its
+    receiver and underlying function rather than its own id()
+    """
+    underlying = getattr(func, '__func__', None)
+    if underlying is not None:
+        return (ctype, id(func.__self__), underlying)
+    return (ctype, id(func))
+
+# Callback function-pointer types, resolved once rather than per callback
+TRADE_CALLBACK_T = ffi.typeof("mx_trade_callback_t")
+ORDER_CALLBACK_T = ffi.typeof("mx_order_callback_t")
+
 def create_trade_callback(func):
-    """Create a C callback for trades"""
-    @ffi.callback("void(void*, unsigned long long, unsigned long long, unsigned int, unsigned int, unsigned long long)")
+    """Create a C callback for trades (one per func, reused on later calls)"""
+    key = _callback_key(TRADE_CALLBACK_T, func)
+    existing = _callback_storage.get(key)
+    if existing is not None:
+        return existing
+    
+    @ffi.callback(TRADE_CALLBACK_T)
     def callback(user_data, aggressive_id, passive_id, price, quantity, timestamp):
         func(aggressive_id, passive_id, price, quantity, timestamp)
-    _callback_storage[id(func)] = callback
+    _callback_storage[key] = callback
     return callback
 
 def create_order_callback(func):
-    """Create a C callback for order events"""
-    @ffi.callback("void(void*, unsigned long long, mx_order_event_t, unsigned int, unsigned int)")
+    """Create a C callback for order events (one per func, reused on later calls)"""
+    key = _callback_key(ORDER_CALLBACK_T, func)
+    existing = _callback_storage.get(key)
+    if existing is not None:
+        return existing
+    
+    @ffi.callback(ORDER_CALLBACK_T)
     def callback(user_data, order_id, event, filled_qty, remaining_qty):
         func(order_id, event, filled_qty, remaining_qty)
-    _callback_storage[id(func)] = callback
+    _callback_storage[key] = callback
     return callback
 
-# Safe constant getter
-def safe_get_constant(name, default=0):
-    """Safely get a constant from the library"""
-    try:
-        return getattr(lib, name)
-    except AttributeError:
-        return default
-
-# Try to get constants (using the enum values directly)
+# Enum values from matchengine.h, written out so importing this module
+# does no attribute lookups on lib (test_basic checks them against it)
 SIDE_BUY = 0  # MX_SIDE_BUY
 SIDE_SELL = 1  # MX_SIDE_SELL
 ORDER_TYPE_LIMIT = 0  # MX_ORDER_TYPE_LIMIT
@@ -314,12 +371,12 @@ STATUS_ERROR = -1  # MX_STATUS_ERROR
 STATUS_INVALID_PARAM = -2  # MX_STATUS_INVALID_PARAM
 STATUS_OUT_OF_MEMORY = -3  # MX_STATUS_OUT_OF_MEMORY
 STATUS_ORDER_NOT_FOUND = -4  # MX_STATUS_ORDER_NOT_FOUND
-STATUS_INVALID_PRICE = -5
-STATUS_INVALID_QUANTITY = -6
+STATUS_INVALID_PRICE = -5  # MX_STATUS_INVALID_PRICE
+STATUS_INVALID_QUANTITY = -6  # MX_STATUS_INVALID_QUANTITY
 STATUS_DUPLICATE_ORDER = -7  # MX_STATUS_DUPLICATE_ORDER
 STATUS_WOULD_MATCH = -8  # MX_STATUS_WOULD_MATCH
 STATUS_CANNOT_FILL = -9  # MX_STATUS_CANNOT_FILL
-STATUS_STOP_NOT_TRIGGERED = -10
+STATUS_STOP_NOT_TRIGGERED = -10  # MX_STATUS_STOP_NOT_TRIGGERED
 EVENT_ACCEPTED = 0  # MX_EVENT_ORDER_ACCEPTED
 EVENT_REJECTED = 1  # MX_EVENT_ORDER_REJECTED
 EVENT_FILLED = 2  # MX_EVENT_ORDER_FILLED
@@ -327,5 +384,6 @@ EVENT_PARTIAL = 3  # MX_EVENT_ORDER_PARTIAL
 EVENT_CANCELLED = 4  # MX_EVENT_ORDER_CANCELLED
 EVENT_EXPIRED = 5  # MX_EVENT_ORDER_EXPIRED
 EVENT_TRIGGERED = 6  # MX_EVENT_ORDER_TRIGGERED
-
-print("✓ Test helpers initialized successfully")
+OP_ADD_LIMIT = 0  # MX_OP_ADD_LIMIT
+OP_ADD_MARKET = 1  # MX_OP_ADD_MARKET
+OP_CANCEL = 2  # MX_OP_CANCEL